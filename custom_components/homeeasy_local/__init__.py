@@ -1,22 +1,23 @@
 """Custom integration to integrate Home Easy compatible HVAC with Home Assistant."""
 import asyncio
-from .coordinator import UpdateCoordinator
-from datetime import timedelta
 import logging
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.entity_platform import DATA_ENTITY_PLATFORM
 from homeassistant.helpers.typing import ConfigType
-from homeassistant.exceptions import ConfigEntryNotReady
 
 from .const import (
     CONF_IP,
+    CONF_PORT,
+    DEFAULT_PORT,
     DOMAIN,
     PLATFORMS,
     STARTUP_MESSAGE,
 )
-
-SCAN_INTERVAL = timedelta(seconds=30)
+from .coordinator import UpdateCoordinator
+from .services import async_setup_services
+from .storage import async_get_store
 
 _LOGGER: logging.Logger = logging.getLogger(__package__)
 
@@ -24,6 +25,7 @@ _LOGGER: logging.Logger = logging.getLogger(__package__)
 async def async_setup(hass: HomeAssistant, config: ConfigType):
     """Set up this integration using YAML is not supported."""
     hass.data.setdefault(DOMAIN, {})
+    await async_setup_services(hass)
     return True
 
 
@@ -34,25 +36,52 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
         _LOGGER.info(STARTUP_MESSAGE)
 
     ip = entry.data.get(CONF_IP)
+    port = entry.data.get(CONF_PORT, DEFAULT_PORT)
 
-    coordinator = UpdateCoordinator(hass, ip)
-    await coordinator.async_refresh()
-
-    if not coordinator.last_update_success:
-        raise ConfigEntryNotReady
+    coordinator = UpdateCoordinator(hass, ip, port)
+    coordinator.async_apply_options(entry.options)
+    # Never wait for the unit here: show the last known state and let the
+    # connection come up in the background, however slow or offline it is.
+    adopted = await coordinator.async_adopt()
+    if not adopted:
+        await coordinator.async_restore()
 
     hass.data[DOMAIN][entry.entry_id] = coordinator
 
-    for platform in PLATFORMS:
-        if entry.options.get(platform, True):
-            coordinator.platforms.append(platform)
-                
+    coordinator.platforms = _enabled_platforms(entry)
     await hass.config_entries.async_forward_entry_setups(entry, coordinator.platforms)
+    if not adopted:
+        coordinator.async_schedule_first_refresh()
 
-    entry.add_update_listener(async_reload_entry)
+    # Unloading a single platform runs the entry's unload callbacks, the
+    # listener goes away with the coordinator instead.
+    coordinator.async_on_close(entry.add_update_listener(async_update_options))
     return True
 
 
+def _enabled_platforms(entry: ConfigEntry) -> list[str]:
+    """Return the platforms the options leave enabled."""
+    return [platform for platform in PLATFORMS if entry.options.get(platform, True)]
+
+
+@callback
+def _async_forget_platforms(
+    hass: HomeAssistant, entry: ConfigEntry, platforms: list[str]
+) -> None:
+    """Drop the unloaded entity platforms of the entry.
+
+    Home Assistant resets them on unload but keeps them registered, each
+    reload would leave one per platform behind.
+    """
+    registered = hass.data.get(DATA_ENTITY_PLATFORM, {}).get(DOMAIN)
+    if registered:
+        registered[:] = [
+            platform
+            for platform in registered
+            if platform.config_entry is not entry or platform.domain not in platforms
+        ]
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Handle removal of an entry."""
     coordinator = hass.data[DOMAIN][entry.entry_id]
@@ -65,13 +94,35 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
             ]
         )
     )
+    _async_forget_platforms(hass, entry, coordinator.platforms)
     if unloaded:
         hass.data[DOMAIN].pop(entry.entry_id)
+        await coordinator.async_close()
 
     return unloaded
 
 
-async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
-    """Reload config entry."""
-    await async_unload_entry(hass, entry)
-    await async_setup_entry(hass, entry)
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Forget the stored state of a removed entry."""
+    store = async_get_store(hass)
+    await store.async_load()
+    store.async_remove(entry.entry_id)
+
+
+async def async_update_options(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply changed options without reconnecting.
+
+    Only the platforms toggled on or off are set up or unloaded, the others
+    keep their entities.
+    """
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    coordinator.async_apply_options(entry.options)
+    platforms = _enabled_platforms(entry)
+    removed = [p for p in coordinator.platforms if p not in platforms]
+    added = [p for p in platforms if p not in coordinator.platforms]
+    if removed:
+        await hass.config_entries.async_unload_platforms(entry, removed)
+        _async_forget_platforms(hass, entry, removed)
+    coordinator.platforms = platforms
+    if added:
+        await hass.config_entries.async_forward_entry_setups(entry, added)
@@ -0,0 +1,118 @@
+"""Traffic capture and replay for Home Easy HVAC Local.
+
+A capture is a magic number followed by fixed size records: the wall clock
+time, the kind of record and a 21 byte frame. Frames are appended as received
+from the unit, states as published to the entities, with the changes awaiting
+confirmation applied.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Iterable, Iterator
+import os
+import struct
+import time
+from typing import TYPE_CHECKING
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+from .codec import FRAME_SIZE, State
+from .const import DOMAIN
+
+if TYPE_CHECKING:
+    from .coordinator import UpdateCoordinator
+
+MAGIC = b"HEC1"
+RECORD = struct.Struct(f"<dB{FRAME_SIZE}s")
+# Kinds of records.
+FRAME = 0
+STATE = 1
+# Records are written in batches at most this many seconds old.
+FLUSH_DELAY = 1.0
+
+
+def capture_path(hass: HomeAssistant, entry_id: str) -> str:
+    """Return where the traffic of an entry is captured."""
+    return hass.config.path(DOMAIN, f"{entry_id}.capture")
+
+
+def append_records(path: str, records: Iterable[tuple[float, int, bytes]]) -> None:
+    """Append records to a capture, creating it if needed."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "ab") as file:
+        if file.tell() == 0:
+            file.write(MAGIC)
+        file.write(b"".join(RECORD.pack(*record) for record in records))
+
+
+def read_records(path: str) -> Iterator[tuple[float, int, bytes]]:
+    """Return the records of a capture, a truncated last one is skipped."""
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a capture")
+        data = file.read()
+    usable = len(data) - len(data) % RECORD.size
+    yield from RECORD.iter_unpack(memoryview(data)[:usable])
+
+
+class CaptureWriter:
+    """Record the traffic of a unit, written to the file from the executor."""
+
+    def __init__(self, hass: HomeAssistant, path: str) -> None:
+        """Initialize."""
+        self._hass = hass
+        self.path = path
+        self._records: list[tuple[float, int, bytes]] = []
+        self._lock = asyncio.Lock()
+        self._unsub: CALLBACK_TYPE | None = None
+
+    @callback
+    def async_record(self, kind: int, frame: bytes) -> None:
+        """Queue a record, the file is written shortly after."""
+        self._records.append((time.time(), kind, frame))
+        if self._unsub is None:
+            self._unsub = async_call_later(self._hass, FLUSH_DELAY, self._flush)
+
+    @callback
+    def _flush(self, _now) -> None:
+        self._unsub = None
+        self._hass.async_create_background_task(self.async_flush(), f"{DOMAIN} capture")
+
+    async def async_flush(self) -> None:
+        """Write the queued records, in the order they came."""
+        async with self._lock:
+            records, self._records = self._records, []
+            if records:
+                await self._hass.async_add_executor_job(
+                    append_records, self.path, records
+                )
+
+    async def async_close(self) -> None:
+        """Write what is queued and stop."""
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+        await self.async_flush()
+
+
+async def async_replay(
+    coordinator: UpdateCoordinator, path: str, speed: float = 1.0
+) -> int:
+    """Feed the frames of a capture to a coordinator and its entities.
+
+    The gaps between frames are kept, divided by speed, a speed of zero replays
+    as fast as the coordinator takes them. Return the number of frames.
+    """
+    records = await coordinator.hass.async_add_executor_job(
+        lambda: [record for record in read_records(path) if record[1] == FRAME]
+    )
+    loop = coordinator.hass.loop
+    start = loop.time()
+    for stamp, _, frame in records:
+        if speed:
+            delay = start + (stamp - records[0][0]) / speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        await coordinator.connection.async_receive(State(frame))
+    return len(records)
@@ -1,8 +1,5 @@
 """Climate platform for Home Easy HVAC Local."""
-from typing import List
-
-from homeeasy.DeviceState import Mode, FanMode, HorizontalFlowMode, VerticalFlowMode
-from homeeasy.HomeEasyLib import HomeEasyLib, DeviceState
+from homeeasy.DeviceState import FanMode
 
 from homeassistant.components.climate import ClimateEntity
 from homeassistant.components.climate.const import (
@@ -10,48 +7,29 @@ from homeassistant.components.climate.const import (
     ClimateEntityFeature,
 )
 from homeassistant.const import ATTR_TEMPERATURE, UnitOfTemperature
+from homeassistant.core import callback
 
-from .const import DOMAIN, ICON, CLIMATE
+from .const import DOMAIN, CLIMATE, MAX_TEMP, MIN_TEMP
+from .coordinator import STATE_FIELDS
 from .entity import Entity
+from .modes import (
+    FLOW_TO_SWING_MODE,
+    HA_STATE_TO_MODE_MAP,
+    MODE_TO_HA_STATE_MAP,
+    SUPPORT_FAN,
+    SUPPORT_HVAC,
+    SWING_MODE_CUSTOM,
+    SWING_MODE_NAMES,
+    SWING_MODES,
+)
 
-SUPPORT_FAN = [
-    "Auto",
-    "Lowest",
-    "Low",
-    "Mid-low",
-    "Mid-high",
-    "High",
-    "Highest",
-    "Quite",
-    "Turbo",
-]
-
-SUPPORT_HVAC = [
-    HVACMode.OFF,
-    HVACMode.AUTO,
-    HVACMode.COOL,
-    HVACMode.DRY,
-    HVACMode.FAN_ONLY,
-    HVACMode.HEAT,
-]
-
-HA_STATE_TO_MODE_MAP = {
-    HVACMode.AUTO: Mode.Auto,
-    HVACMode.COOL: Mode.Cool,
-    HVACMode.DRY: Mode.Dry,
-    HVACMode.FAN_ONLY: Mode.Fan,
-    HVACMode.HEAT: Mode.Heat,
-}
-
-MODE_TO_HA_STATE_MAP = {value: key for key, value in HA_STATE_TO_MODE_MAP.items()}
-
-SWING_MODES = {
-    "Stop": (HorizontalFlowMode.Stop, VerticalFlowMode.Stop),
-    "Horizontal": (HorizontalFlowMode.Swing, VerticalFlowMode.Stop),
-    "Vertical": (HorizontalFlowMode.Stop, VerticalFlowMode.Swing),
-    "Both": (HorizontalFlowMode.Swing, VerticalFlowMode.Swing),
-    "Custom": (HorizontalFlowMode.Stop, VerticalFlowMode.Stop),
-}
+SUPPORTED_FEATURES = (
+    ClimateEntityFeature.TARGET_TEMPERATURE
+    | ClimateEntityFeature.FAN_MODE
+    | ClimateEntityFeature.SWING_MODE
+    | ClimateEntityFeature.TURN_OFF
+    | ClimateEntityFeature.TURN_ON
+)
 
 
 async def async_setup_entry(hass, entry, async_add_devices):
@@ -63,141 +41,67 @@ async def async_setup_entry(hass, entry, async_add_devices):
 class HomeEasyHvacLocal(Entity, ClimateEntity):
     """Home Easy Local climate class."""
 
-    @property
-    def should_poll(self) -> bool:
-        """Return True if entity has to be polled for state.
-
-        False if entity pushes its state to HA.
-        """
-        return True
-
-    @property
-    def supported_features(self) -> int:
-        """Return the list of supported features."""
-        return ClimateEntityFeature.TARGET_TEMPERATURE | ClimateEntityFeature.FAN_MODE | ClimateEntityFeature.SWING_MODE | ClimateEntityFeature.TURN_OFF | ClimateEntityFeature.TURN_ON
+    fields = frozenset(STATE_FIELDS) - {"display"}
+    _attr_supported_features = SUPPORTED_FEATURES
+    _attr_hvac_modes = SUPPORT_HVAC
+    _attr_fan_modes = SUPPORT_FAN
+    _attr_swing_modes = SWING_MODE_NAMES
+    _attr_target_temperature_step = 1
+    _attr_min_temp = MIN_TEMP
+    _attr_max_temp = MAX_TEMP
+    _attr_temperature_unit = UnitOfTemperature.CELSIUS
+    _attr_hvac_mode = HVACMode.OFF
+    _attr_fan_mode = SUPPORT_FAN[0]
+    _attr_swing_mode = SWING_MODE_CUSTOM
 
     @property
     def name(self) -> str:
         """Return the name of the thermostat, if any."""
         return f"{super().name}_{CLIMATE}"
 
-    @property
-    def temperature_unit(self) -> str:
-        """Return the unit of measurement."""
-        if (
-            self.coordinator.state == None
-            or not self.coordinator.state.temperatureScale
-        ):
-            return UnitOfTemperature.CELSIUS
-        return UnitOfTemperature.FAHRENHEIT
-
-    @property
-    def current_temperature(self) -> float:
-        """Return the current temperature."""
-        if self.coordinator.state is None:
-            return None
-        return self.coordinator.state.indoorTemperature
-
-    @property
-    def target_temperature(self) -> float :
-        """Return the temperature we try to reach."""
-        if self.coordinator.state is None:
-            return None
-        return self.coordinator.state.desiredTemperature
+    @callback
+    def _async_update_attrs(self) -> None:
+        """Compute the attributes from the reported state."""
+        state = self.coordinator.shown_state
+        if state is None:
+            return
+        self._attr_temperature_unit = (
+            UnitOfTemperature.FAHRENHEIT
+            if state.temperatureScale
+            else UnitOfTemperature.CELSIUS
+        )
+        self._attr_current_temperature = state.indoorTemperature
+        self._attr_target_temperature = state.desiredTemperature
+        self._attr_hvac_mode = (
+            MODE_TO_HA_STATE_MAP[state.mode] if state.power else HVACMode.OFF
+        )
+        self._attr_fan_mode = SUPPORT_FAN[int(state.fanMode)]
+        self._attr_swing_mode = FLOW_TO_SWING_MODE.get(
+            (state.flowHorizontalMode, state.flowVerticalMode), SWING_MODE_CUSTOM
+        )
 
     async def async_set_temperature(self, **kwargs) -> None:
         """Set new target temperature."""
         temperature = kwargs.get(ATTR_TEMPERATURE)
         if temperature is None:
             return
-        state = self.coordinator.state
-        state.desiredTemperature = temperature
-        await self.coordinator.send(state)
-
-    @property
-    def target_temperature_step(self) -> float:
-        """Return the supported step of target temperature."""
-        return 1
-
-    @property
-    def min_temp(self) -> float:
-        """Return the minimum temperature."""
-        return 16
-
-    @property
-    def max_temp(self) -> float:
-        """Return the maximum temperature."""
-        return 31
-
-    @property
-    def hvac_mode(self) -> str:
-        """Return current operation ie. heat, cool, idle."""
-        if self.coordinator.state is None or not self.coordinator.state.power:
-            return HVACMode.OFF 
-
-        return MODE_TO_HA_STATE_MAP[self.coordinator.state.mode]
+        await self.coordinator.send(desiredTemperature=temperature)
 
     async def async_set_hvac_mode(self, hvac_mode: str) -> None:
         """Set new target operation mode."""
-        state = self.coordinator.state
         if hvac_mode == HVACMode.OFF:
-            state.power = False
+            await self.coordinator.send(power=False)
         else:
-            state.power = True
-            state.mode = HA_STATE_TO_MODE_MAP[hvac_mode]
-        await self.coordinator.send(state)
-
-    @property
-    def hvac_modes(self):
-        """Return the list of available operation modes."""
-        return SUPPORT_HVAC
-
-    @property
-    def fan_mode(self) -> str:
-        """Return the fan setting."""
-        if self.coordinator.state is None:
-            return  SUPPORT_FAN[0]
-        mode = int(self.coordinator.state.fanMode)
-        return SUPPORT_FAN[mode]
+            await self.coordinator.send(
+                power=True, mode=HA_STATE_TO_MODE_MAP[hvac_mode]
+            )
 
     async def async_set_fan_mode(self, fan_mode: str) -> None:
         """Set fan mode."""
         index = SUPPORT_FAN.index(fan_mode)
-        state = self.coordinator.state
-        state.fanMode = FanMode(index)
-        await self.coordinator.send(state)
-
-    @property
-    def fan_modes(self) -> List[str]:
-        """List of available fan modes."""
-        return SUPPORT_FAN
-
-    @property
-    def swing_mode(self) -> str:
-        """Return the swing setting."""
-        if self.coordinator.state is None:
-            return list(SWING_MODES.keys())[-1]
-
-        for (key, value) in SWING_MODES.items():
-            h, v = value
-            if (
-                h == self.coordinator.state.flowHorizontalMode
-                and v == self.coordinator.state.flowVerticalMode
-            ):
-                return key
-        return list(SWING_MODES.keys())[-1]
-
-    @property
-    def swing_modes(self) -> List[str]:
-        """Return the list of available swing modes."""
-        return list(SWING_MODES.keys())
+        await self.coordinator.send(fanMode=FanMode(index))
 
     async def async_set_swing_mode(self, swing_mode: str) -> None:
         """Set new target swing operation."""
-        if self.coordinator.state is None:
-            return
         h, v = SWING_MODES[swing_mode]
-        state = self.coordinator.state
-        state.flowHorizontalMode = h
-        state.flowVerticalMode = v
-        await self.coordinator.send(state)
+        await self.coordinator.send(flowHorizontalMode=h, flowVerticalMode=v)
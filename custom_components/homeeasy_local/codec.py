@@ -0,0 +1,85 @@
+"""Frame codec of the Home Easy local protocol."""
+from homeeasy.DeviceState import DeviceState
+
+FRAME_SIZE = 21
+HEADER = bytes([170, 170, 18])
+# Offsets of the frame type and of the first state byte.
+TYPE = 3
+BODY = 4
+COMMAND = 0x01
+STATUS_REQUEST = bytes(
+    [170, 170, 18, 160, 10, 10, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 26]
+)
+
+
+def checksum(frame) -> int:
+    """Return the checksum of a frame, any buffer works."""
+    return sum(frame[:-1]) & 0xFF
+
+
+class State(DeviceState):
+    """DeviceState masking its fields in and out of the frame bytes.
+
+    The library unpacks a frame into a list of 168 bools and packs it back on
+    every read of raw or cmd. Here each field is a shift and a mask on the
+    21 bytes, which are copied once out of the buffer they were received in.
+    """
+
+    def __init__(self, message) -> None:
+        """Initialize from a frame, a memoryview of the receive buffer works."""
+        self._frame = bytearray(message[:FRAME_SIZE])
+
+    @property
+    def raw(self) -> bytes:
+        """Return the frame."""
+        return bytes(self._frame)
+
+    @raw.setter
+    def raw(self, value) -> None:
+        self._frame = bytearray(value[:FRAME_SIZE])
+
+    def copy(self) -> "State":
+        """Return a copy to change."""
+        return State(self._frame)
+
+    @property
+    def bits(self) -> list[bool]:
+        """Return the bits of the frame, like the library keeps them."""
+        return self._bytes2bits(self._frame)
+
+    @property
+    def cmd(self) -> bytes:
+        """Return the command frame setting this state."""
+        buffer = bytearray(FRAME_SIZE)
+        self.encode_command(buffer)
+        return bytes(buffer)
+
+    def encode_command(self, buffer: bytearray) -> None:
+        """Write the command frame setting this state into the buffer."""
+        buffer[:] = self._frame
+        buffer[TYPE] = COMMAND
+        buffer[-1] = checksum(buffer)
+
+    def _get_state_bit(self, x: int, y: int) -> bool:
+        return bool(self._frame[x + BODY] >> (7 - y) & 1)
+
+    def _set_state_bit(self, byte_pos: int, bit_pos: int, val) -> None:
+        if type(val) is str:
+            val = val.lower() not in ("false", "0")
+        mask = 0x80 >> bit_pos
+        if val:
+            self._frame[byte_pos + BODY] |= mask
+        else:
+            self._frame[byte_pos + BODY] &= ~mask & 0xFF
+
+    def _get_state_bits(self, x: int, y: int, count: int) -> int:
+        # Every field of the protocol fits in a single byte.
+        return self._frame[x + BODY] >> (8 - y - count) & ((1 << count) - 1)
+
+    def _set_state_bits(self, x: int, y: int, count: int, val) -> None:
+        shift = 8 - y - count
+        mask = ((1 << count) - 1) << shift
+        index = x + BODY
+        self._frame[index] = (
+            self._frame[index] & ~mask & 0xFF | int(val) << shift & mask
+        )
@@ -1,16 +1,35 @@
 """Adds config flow for Home Easy HVAC Local."""
 import logging
-from homeassistant import config_entries
+from homeassistant import config_entries, data_entry_flow
 from homeassistant.core import callback
-from homeassistant.helpers.aiohttp_client import async_create_clientsession
-from homeeasy.HomeEasyLibLocal import HomeEasyLibLocal
+from homeassistant.helpers import config_validation as cv
 import voluptuous as vol
 
 from .const import (
+    CONF_CAPTURE,
+    CONF_COALESCE_WINDOW,
+    CONF_COOLDOWN,
+    CONF_HEARTBEAT_MISSES,
     CONF_IP,
+    CONF_PORT,
+    CONF_RECONCILE,
+    CONF_SCAN_INTERVAL,
+    CONF_SUBNETS,
+    CONF_UNITS,
+    DEFAULT_COALESCE_WINDOW,
+    DEFAULT_COOLDOWN,
+    DEFAULT_HEARTBEAT_MISSES,
+    DEFAULT_PORT,
+    DEFAULT_RECONCILE,
+    DEFAULT_SCAN_INTERVAL,
     DOMAIN,
     PLATFORMS,
+    RECONCILE_ENFORCE,
+    RECONCILE_OFF,
+    RECONCILE_RETRY,
 )
+from .discovery import async_default_networks, async_scan
+from .hub import async_get_hub
 
 _LOGGER: logging.Logger = logging.getLogger(__package__)
 
@@ -24,14 +43,29 @@ class FlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
     def __init__(self):
         """Initialize."""
         self._errors = {}
+        self._port = DEFAULT_PORT
+        self._found = []
+        self._discovered = {}
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        """Return the options flow."""
+        return OptionsFlowHandler(config_entry)
 
     async def async_step_user(self, user_input=None):
         """Handle a flow initialized by the user."""
+        return self.async_show_menu(step_id="user", menu_options=["manual", "scan"])
+
+    async def async_step_manual(self, user_input=None):
+        """Handle a unit entered by address."""
         self._errors = {}
 
         if user_input is not None:
             _LOGGER.debug(f"IP {user_input[CONF_IP]}")
-            valid = await self._test_connection(user_input[CONF_IP])
+            valid = await self._test_connection(
+                user_input[CONF_IP], user_input.get(CONF_PORT, DEFAULT_PORT)
+            )
             if valid:
                 return self.async_create_entry(
                     title=user_input[CONF_IP], data=user_input
@@ -43,22 +77,188 @@ class FlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
 
         return await self._show_config_form(user_input)
 
+    async def async_step_scan(self, user_input=None):
+        """Sweep subnets for units."""
+        self._errors = {}
+
+        if user_input is not None:
+            self._port = user_input[CONF_PORT]
+            try:
+                networks = cv.ensure_list_csv(user_input[CONF_SUBNETS])
+                self._found = await async_scan(
+                    networks,
+                    self._port,
+                    exclude=self._configured_ips(self._port),
+                )
+            except ValueError:
+                self._errors["base"] = "invalid_subnet"
+            else:
+                if self._found:
+                    return await self.async_step_pick()
+                self._errors["base"] = "no_devices"
+            subnets = user_input[CONF_SUBNETS]
+        else:
+            subnets = ", ".join(await async_default_networks(self.hass))
+
+        return self.async_show_form(
+            step_id="scan",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(CONF_SUBNETS, default=subnets): str,
+                    vol.Optional(CONF_PORT, default=self._port): int,
+                }
+            ),
+            errors=self._errors,
+        )
+
+    async def async_step_pick(self, user_input=None):
+        """Let the user pick the found units to add."""
+        if user_input is not None and user_input[CONF_UNITS]:
+            first, *others = user_input[CONF_UNITS]
+            for ip in others:
+                self.hass.async_create_task(
+                    self.hass.config_entries.flow.async_init(
+                        DOMAIN,
+                        context={"source": config_entries.SOURCE_IMPORT},
+                        data={CONF_IP: ip, CONF_PORT: self._port},
+                    )
+                )
+            return await self.async_step_import(
+                {CONF_IP: first, CONF_PORT: self._port}
+            )
+
+        return self.async_show_form(
+            step_id="pick",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(CONF_UNITS, default=self._found): cv.multi_select(
+                        {ip: ip for ip in self._found}
+                    ),
+                }
+            ),
+        )
+
+    async def async_step_import(self, import_info):
+        """Add a unit picked from a scan without asking again."""
+        await self._async_set_address(import_info)
+        return self.async_create_entry(title=import_info[CONF_IP], data=import_info)
+
+    async def async_step_integration_discovery(self, discovery_info):
+        """Handle a unit found by the scan service."""
+        await self._async_set_address(discovery_info)
+        self._discovered = discovery_info
+        self.context["title_placeholders"] = {CONF_IP: discovery_info[CONF_IP]}
+        return await self.async_step_discovery_confirm()
+
+    async def async_step_discovery_confirm(self, user_input=None):
+        """Confirm adding a discovered unit."""
+        if user_input is not None:
+            return self.async_create_entry(
+                title=self._discovered[CONF_IP], data=self._discovered
+            )
+
+        self._set_confirm_only()
+        return self.async_show_form(
+            step_id="discovery_confirm",
+            description_placeholders={CONF_IP: self._discovered[CONF_IP]},
+        )
+
+    async def _async_set_address(self, data):
+        """Abort if the unit at the address is already configured."""
+        port = data.get(CONF_PORT, DEFAULT_PORT)
+        await self.async_set_unique_id(f"{data[CONF_IP]}:{port}")
+        self._abort_if_unique_id_configured()
+        if data[CONF_IP] in self._configured_ips(port):
+            raise data_entry_flow.AbortFlow("already_configured")
+
+    @callback
+    def _configured_ips(self, port):
+        """Return the addresses of units already set up on the port."""
+        return {
+            entry.data.get(CONF_IP)
+            for entry in self._async_current_entries(include_ignore=False)
+            if entry.data.get(CONF_PORT, DEFAULT_PORT) == port
+        }
+
     async def _show_config_form(self, user_input):  # pylint: disable=unused-argument
         """Show the configuration form to edit location data."""
         return self.async_show_form(
-            step_id="user",
-            data_schema=vol.Schema({vol.Required(CONF_IP): str}),
+            step_id="manual",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(CONF_IP): str,
+                    vol.Optional(CONF_PORT, default=DEFAULT_PORT): int,
+                }
+            ),
             errors=self._errors,
         )
 
-    async def _test_connection(self, ip):
-        """Return true if credentials is valid."""
+    async def _test_connection(self, ip, port=DEFAULT_PORT):
+        """Return true if the unit answers.
+
+        The verified link and state stay with the hub for a while, so setting
+        up the entry adopts them instead of connecting again.
+        """
+        hub = async_get_hub(self.hass)
+        connection = hub.async_lease(ip, port)
         try:
-            client = HomeEasyLibLocal(self.hass.loop, None)
-            await client.connect(ip)
-            await client.request_status_async()
-            await client.disconnect()
+            await connection.async_fetch_state()
             return True
         except Exception:  # pylint: disable=broad-except
-            pass
+            await hub.async_end_lease(ip, port)
         return False
+
+
+class OptionsFlowHandler(config_entries.OptionsFlow):
+    """Options flow for Home Easy HVAC Local, applied without a reload."""
+
+    def __init__(self, config_entry):
+        """Initialize."""
+        self.config_entry = config_entry
+
+    async def async_step_init(self, user_input=None):
+        """Manage the options."""
+        if user_input is not None:
+            return self.async_create_entry(title="", data=user_input)
+
+        options = self.config_entry.options
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(
+                        CONF_SCAN_INTERVAL,
+                        default=options.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=5, max=3600)),
+                    vol.Required(
+                        CONF_COOLDOWN,
+                        default=options.get(CONF_COOLDOWN, DEFAULT_COOLDOWN),
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0, max=600)),
+                    vol.Required(
+                        CONF_COALESCE_WINDOW,
+                        default=options.get(
+                            CONF_COALESCE_WINDOW, DEFAULT_COALESCE_WINDOW
+                        ),
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0, max=5)),
+                    vol.Required(
+                        CONF_RECONCILE,
+                        default=options.get(CONF_RECONCILE, DEFAULT_RECONCILE),
+                    ): vol.In([RECONCILE_OFF, RECONCILE_RETRY, RECONCILE_ENFORCE]),
+                    vol.Required(
+                        CONF_HEARTBEAT_MISSES,
+                        default=options.get(
+                            CONF_HEARTBEAT_MISSES, DEFAULT_HEARTBEAT_MISSES
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=10)),
+                    vol.Required(
+                        CONF_CAPTURE, default=options.get(CONF_CAPTURE, False)
+                    ): bool,
+                    **{
+                        vol.Required(
+                            platform, default=options.get(platform, True)
+                        ): bool
+                        for platform in PLATFORMS
+                    },
+                }
+            ),
+        )
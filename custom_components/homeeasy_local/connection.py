@@ -0,0 +1,380 @@
+"""Connection manager for Home Easy HVAC Local."""
+import asyncio
+from collections import deque
+from collections.abc import Coroutine
+from contextlib import suppress
+from datetime import timedelta
+from enum import StrEnum
+import logging
+import random
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+from .const import DEFAULT_HEARTBEAT_MISSES
+from .metrics import DeviceMetrics
+from .transport import LocalClient
+
+BACKOFF_MIN = timedelta(seconds=1)
+# Kept short so a unit coming back is noticed quickly, a retry is one packet.
+BACKOFF_MAX = timedelta(seconds=30)
+# A unit that is gone drops the SYN, do not wait for the OS to give up.
+CONNECT_TIMEOUT = timedelta(seconds=5)
+STATUS_TIMEOUT = timedelta(seconds=5)
+# Heartbeats without any frame before a silent link is probed.
+PROBE_BEATS = 3
+# A command frame is answered by the push of the resulting state.
+COMMAND_TIMEOUT = timedelta(seconds=5)
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+
+class ConnectionState(StrEnum):
+    """State of the link to a unit."""
+
+    DISCONNECTED = "disconnected"
+    CONNECTING = "connecting"
+    CONNECTED = "connected"
+    BACKOFF = "backoff"
+
+
+class _Request:
+    """A request written to the unit and not answered yet."""
+
+    __slots__ = ("sent_at", "waiters", "expiry")
+
+    def __init__(self, sent_at: float) -> None:
+        self.sent_at = sent_at
+        self.waiters: list[asyncio.Future] = []
+        self.expiry: asyncio.TimerHandle = None
+
+
+class Connection:
+    """Keep the link to a unit up, reconnecting with backoff when it drops.
+
+    Requests are written as soon as they are made, whatever is still waiting
+    for an answer, and tracked until a frame answers them or their own timeout
+    runs out. The protocol carries no request ids: any frame holds the whole
+    state so it answers every status request in flight, and the unit pushes
+    one frame per command so it answers the oldest command.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        ip: str,
+        port: int,
+        update_callback,
+        state_callback,
+    ) -> None:
+        """Initialize."""
+        self._hass = hass
+        self._ip = ip
+        self._port = port
+        self._update_callback = update_callback
+        self._state_callback = state_callback
+        self._client = LocalClient(hass.loop, self.async_receive, self._on_lost)
+        self.state = ConnectionState.DISCONNECTED
+        self.connects = 0
+        self.disconnects = 0
+        self.failures = 0
+        self.last_state = None
+        self.metrics = DeviceMetrics()
+        # Heartbeats in a row without any frame before the link is dropped,
+        # per subscriber. The most impatient one decides for a shared link.
+        self._miss_thresholds: dict = {}
+        self.misses = 0
+        self._silent_beats = 0
+        self._statuses: deque[_Request] = deque()
+        self._commands: deque[_Request] = deque()
+        self._connect_lock = asyncio.Lock()
+        self._closed = False
+        self._attempt = 0
+        self._awaiting_since: float = None
+        self._last_frame: float = None
+        self._beat_frame: float = None
+        self._unsub_retry = None
+
+    @property
+    def connected(self) -> bool:
+        """Return True if the link is up."""
+        return self.state == ConnectionState.CONNECTED
+
+    async def async_connect(self) -> None:
+        """Connect now, raising when the unit cannot be reached.
+
+        Callers arriving while another one is connecting share its link. Once
+        async_disconnect was called nothing connects again, a link opened
+        meanwhile is closed right away.
+        """
+        async with self._connect_lock:
+            if self.connected:
+                return
+            if self._closed:
+                raise ConnectionError(f"Connection to {self._ip} was closed")
+            self._cancel_retry()
+            self._set_state(ConnectionState.CONNECTING)
+            try:
+                async with asyncio.timeout(CONNECT_TIMEOUT.total_seconds()):
+                    await self._client.connect(self._ip, self._port)
+            except Exception as err:
+                self.failures += 1
+                if not self._closed:
+                    self._schedule_retry()
+                if isinstance(err, TimeoutError):
+                    raise ConnectionError(
+                        f"Timed out connecting to {self._ip}"
+                    ) from err
+                raise
+            if self._closed:
+                # Closed while connecting, the new link has no users.
+                await self._client.disconnect()
+                raise ConnectionError(f"Connection to {self._ip} was closed")
+            self.connects += 1
+            self._attempt = 0
+            self._awaiting_since = None
+            self.misses = 0
+            self._set_state(ConnectionState.CONNECTED)
+
+    async def async_disconnect(self) -> None:
+        """Close the link for good, a connect in progress is undone."""
+        self._closed = True
+        self._cancel_retry()
+        self._set_state(ConnectionState.DISCONNECTED)
+        await self._client.disconnect()
+        self._fail_requests()
+
+    @property
+    def miss_threshold(self) -> int:
+        """Return the silent heartbeats tolerated, the lowest any subscriber set."""
+        return min(self._miss_thresholds.values(), default=DEFAULT_HEARTBEAT_MISSES)
+
+    @callback
+    def async_set_miss_threshold(self, subscriber, misses: int) -> None:
+        """Set the silent heartbeats a subscriber tolerates, None to forget it."""
+        if misses is None:
+            self._miss_thresholds.pop(subscriber, None)
+        else:
+            self._miss_thresholds[subscriber] = misses
+
+    @property
+    def inflight(self) -> int:
+        """Return the number of requests waiting for an answer."""
+        return len(self._statuses) + len(self._commands)
+
+    async def async_request_status(self, timeout: timedelta = STATUS_TIMEOUT) -> None:
+        """Ask the unit for its state, the reply arrives as a push."""
+        await self._async_request_status(timeout)
+
+    async def async_fetch_state(self, timeout: timedelta = STATUS_TIMEOUT):
+        """Connect if needed, request the state and wait for the reply.
+
+        A status request already in flight is joined rather than sent again,
+        its answer is as fresh as that of a new one would be.
+        """
+        if not self.connected:
+            await self.async_connect()
+        waiter = self._hass.loop.create_future()
+        if self._statuses:
+            request = self._statuses[-1]
+            request.waiters.append(waiter)
+        else:
+            request = await self._async_request_status(timeout, waiter)
+        try:
+            async with asyncio.timeout(timeout.total_seconds()):
+                return await waiter
+        finally:
+            if waiter in request.waiters:
+                request.waiters.remove(waiter)
+
+    async def async_send(self, state, timeout: timedelta = COMMAND_TIMEOUT) -> None:
+        """Send state to the unit, without waiting for requests in flight."""
+        await self._async_write(self._commands, timeout, self._client.send(state))
+
+    async def _async_request_status(
+        self, timeout: timedelta, waiter: asyncio.Future | None = None
+    ) -> _Request:
+        request = await self._async_write(
+            self._statuses, timeout, self._client.request_status_async(), waiter
+        )
+        if self._awaiting_since is None:
+            self._awaiting_since = request.sent_at
+        return request
+
+    async def _async_write(
+        self,
+        requests: deque[_Request],
+        timeout: timedelta,
+        write: Coroutine,
+        waiter: asyncio.Future | None = None,
+    ) -> _Request:
+        """Write a request and track it until answered or timed out."""
+        if not self.connected:
+            write.close()
+            raise ConnectionError(f"Not connected to {self._ip}")
+        request = _Request(self._hass.loop.time())
+        if waiter is not None:
+            request.waiters.append(waiter)
+        request.expiry = self._hass.loop.call_later(
+            timeout.total_seconds(), self._expire, requests, request
+        )
+        requests.append(request)
+        try:
+            await write
+        except Exception:
+            request.expiry.cancel()
+            requests.remove(request)
+            raise
+        return request
+
+    @callback
+    def _expire(self, requests: deque[_Request], request: _Request) -> None:
+        """Give up on a request nothing answered in time."""
+        requests.remove(request)
+        self.metrics.timeouts += 1
+        for waiter in request.waiters:
+            if not waiter.done():
+                waiter.set_exception(TimeoutError())
+
+    def _fail_requests(self) -> None:
+        """Fail every request in flight, the link they went out on is gone."""
+        for requests in (self._statuses, self._commands):
+            while requests:
+                request = requests.popleft()
+                request.expiry.cancel()
+                for waiter in request.waiters:
+                    if not waiter.done():
+                        waiter.set_exception(
+                            ConnectionError(f"Disconnected from {self._ip}")
+                        )
+
+    async def async_receive(self, state) -> None:
+        """Handle a frame from the unit, answering the requests it matches."""
+        now = self._record_frame()
+        self.last_state = state
+        self._awaiting_since = None
+        metrics = self.metrics
+        statuses = self._statuses
+        while statuses:
+            request = statuses.popleft()
+            request.expiry.cancel()
+            metrics.status_round_trip.add((now - request.sent_at) * 1000)
+            for waiter in request.waiters:
+                if not waiter.done():
+                    waiter.set_result(state)
+        if self._commands:
+            request = self._commands.popleft()
+            request.expiry.cancel()
+            metrics.command_confirmation.add((now - request.sent_at) * 1000)
+        await self._update_callback(state)
+
+    @property
+    def commanding(self) -> bool:
+        """Return True while commands wait for their confirmation."""
+        return bool(self._commands)
+
+    @callback
+    def async_heartbeat(self) -> bool:
+        """Check the link is alive, return True when the unit should be probed.
+
+        Called by the heartbeat wheel, which queues the probe with the polls.
+        Any frame since the previous beat counts as an answer, so a unit
+        pushing changes is never asked. A link silent for PROBE_BEATS beats is
+        probed. A beat finding a status request unanswered is a miss, the link
+        is dropped once miss_threshold beats in a row were misses and the
+        request is older than STATUS_TIMEOUT, so a slow reply is waited for.
+        """
+        if not self.connected:
+            return False
+        if self._last_frame != self._beat_frame:
+            self._beat_frame = self._last_frame
+            self.misses = 0
+            self._silent_beats = 0
+            return False
+        if self._awaiting_since is None:
+            self._silent_beats += 1
+            if self._silent_beats < PROBE_BEATS:
+                return False
+            self._silent_beats = 0
+            return True
+        self.misses += 1
+        if (
+            self.misses >= self.miss_threshold
+            and self._hass.loop.time() - self._awaiting_since
+            >= STATUS_TIMEOUT.total_seconds()
+        ):
+            _LOGGER.warning("No answer from %s, reconnecting", self._ip)
+            self.metrics.timeouts += 1
+            self.misses = 0
+            self._hass.async_create_task(self._async_drop())
+        return False
+
+    async def async_poll(self) -> None:
+        """Probe a silent unit, the heartbeat tells whether it answered."""
+        if not self.connected:
+            return
+        with suppress(TimeoutError, ConnectionError):
+            await self.async_fetch_state()
+
+    async def _async_drop(self) -> None:
+        await self._client.disconnect()
+        self._on_lost()
+
+    @callback
+    def _on_lost(self) -> None:
+        """Handle the link going down unexpectedly."""
+        if not self.connected:
+            return
+        _LOGGER.debug("Lost connection to %s", self._ip)
+        self.disconnects += 1
+        self._awaiting_since = None
+        self._fail_requests()
+        self._schedule_retry()
+
+    def _record_frame(self) -> float:
+        """Time the frame against the last one and return when it came."""
+        now = self._hass.loop.time()
+        if self._last_frame is not None:
+            self.metrics.push_interval.add((now - self._last_frame) * 1000)
+        self._last_frame = now
+        return now
+
+    def _backoff_delay(self) -> float:
+        """Return the next retry delay, exponential with full jitter."""
+        delay = min(
+            BACKOFF_MAX.total_seconds(),
+            BACKOFF_MIN.total_seconds() * 2**self._attempt,
+        )
+        return random.uniform(BACKOFF_MIN.total_seconds() / 2, delay)
+
+    @callback
+    def _schedule_retry(self) -> None:
+        delay = self._backoff_delay()
+        self._attempt += 1
+        self._set_state(ConnectionState.BACKOFF)
+        self._unsub_retry = async_call_later(self._hass, delay, self._retry)
+
+    @callback
+    def _retry(self, _now) -> None:
+        self._unsub_retry = None
+        self._hass.async_create_task(self._async_retry())
+
+    async def _async_retry(self) -> None:
+        try:
+            await self.async_connect()
+        except Exception as err:  # pylint: disable=broad-except
+            _LOGGER.debug("Reconnecting to %s failed: %s", self._ip, err)
+            return
+        # The unit pushes changes only to connected clients, catch up on
+        # whatever happened while the link was down.
+        await self.async_request_status()
+
+    def _cancel_retry(self) -> None:
+        if self._unsub_retry is not None:
+            self._unsub_retry()
+            self._unsub_retry = None
+
+    def _set_state(self, state: ConnectionState) -> None:
+        if state != self.state:
+            self.state = state
+            self._state_callback(state)
@@ -14,11 +14,52 @@ ICON = "mdi:air-conditioner"
 CLIMATE = "climate"
 SELECT = "select"
 SWITCH = "switch"
-PLATFORMS = [CLIMATE, SELECT, SWITCH]
+SENSOR = "sensor"
+PLATFORMS = [CLIMATE, SELECT, SWITCH, SENSOR]
 
 
+# Storage
+STORAGE_KEY = f"{DOMAIN}.state"
+STORAGE_VERSION = 1
+
+# Services
+SERVICE_SCAN = "scan"
+SERVICE_BULK_SET = "bulk_set"
+
 # Configuration and options
 CONF_IP = "ip"
+CONF_PORT = "port"
+CONF_COALESCE_WINDOW = "coalesce_window"
+CONF_SUBNETS = "subnets"
+CONF_UNITS = "units"
+CONF_DISPLAY = "display"
+CONF_TIMEOUT = "timeout"
+CONF_RECONCILE = "reconcile"
+CONF_HEARTBEAT_MISSES = "heartbeat_misses"
+CONF_SCAN_INTERVAL = "scan_interval"
+CONF_COOLDOWN = "cooldown"
+CONF_CAPTURE = "capture"
+
+# Reconciliation policies: drop unconfirmed changes, send them again until
+# confirmed, or also restore them when changed with the remote control.
+RECONCILE_OFF = "off"
+RECONCILE_RETRY = "retry"
+RECONCILE_ENFORCE = "enforce"
+
+# Target temperatures the units take, in degrees Celsius.
+MIN_TEMP = 16
+MAX_TEMP = 31
+
+# Defaults
+DEFAULT_PORT = 12416
+DEFAULT_COALESCE_WINDOW = 0.05
+DEFAULT_BULK_TIMEOUT = 15
+DEFAULT_RECONCILE = RECONCILE_RETRY
+DEFAULT_HEARTBEAT_MISSES = 2
+# Seconds between polls of an idle unit that stopped pushing.
+DEFAULT_SCAN_INTERVAL = 30
+# Seconds refresh requests are batched over.
+DEFAULT_COOLDOWN = 60
 
 
 STARTUP_MESSAGE = f"""
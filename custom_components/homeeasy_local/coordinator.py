@@ -1,29 +1,79 @@
 """Custom integration to integrate Home Easy compatible HVAC with Home Assistant."""
-from homeassistant.helpers.debounce import Debouncer
-from homeeasy.DeviceState import DeviceState
-from homeeasy.HomeEasyLibLocal import HomeEasyLibLocal
+import asyncio
+from contextlib import suppress
 from datetime import timedelta
 import logging
+import random
 
-from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
-from homeassistant.exceptions import ConfigEntryNotReady
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
-from homeassistant.helpers.update_coordinator import (
-    DataUpdateCoordinator,
-    REQUEST_REFRESH_DEFAULT_COOLDOWN,
-    REQUEST_REFRESH_DEFAULT_IMMEDIATE,
-    UpdateFailed,
-)
+from homeeasy.DeviceState import DeviceState
 
+from homeassistant.config_entries import current_entry
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.debounce import Debouncer
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+
+from .capture import FRAME, STATE, CaptureWriter, capture_path
+from .connection import ConnectionState
 from .const import (
-    CONF_IP,
+    CONF_CAPTURE,
+    CONF_COALESCE_WINDOW,
+    CONF_COOLDOWN,
+    CONF_HEARTBEAT_MISSES,
+    CONF_RECONCILE,
+    CONF_SCAN_INTERVAL,
+    DEFAULT_COALESCE_WINDOW,
+    DEFAULT_COOLDOWN,
+    DEFAULT_HEARTBEAT_MISSES,
+    DEFAULT_PORT,
+    DEFAULT_RECONCILE,
+    DEFAULT_SCAN_INTERVAL,
     DOMAIN,
-    PLATFORMS,
-    STARTUP_MESSAGE,
+    RECONCILE_ENFORCE,
+    RECONCILE_OFF,
 )
+from .hub import async_get_hub
+from .storage import async_get_store
+from .throttle import TokenBucket
 
-SCAN_INTERVAL = timedelta(seconds=30)
+# Pushes are the source of truth, polls only happen when no push arrived
+# within the interval matching what the unit is doing.
+SCAN_INTERVAL = timedelta(seconds=DEFAULT_SCAN_INTERVAL)
+COMMAND_SCAN_INTERVAL = timedelta(seconds=2)
+OFF_SCAN_INTERVAL = timedelta(minutes=5)
+COMMAND_SETTLE_TIME = timedelta(seconds=20)
+# Units set up from a stored state confirm it within this window, spread out
+# so a restart does not poll every unit at once.
+STARTUP_SPREAD = timedelta(seconds=10)
+# Callers get an error for changes not reported back by then, without
+# reconciliation the changes are rolled back too.
+CONFIRM_TIMEOUT = timedelta(seconds=10)
+# Frames a reconciled field is re-sent in before giving up on it.
+RECONCILE_RETRIES = 3
+# Time a sent frame gets to be reported back before it is sent again.
+RECONCILE_DELAY = timedelta(seconds=2)
+# Frames per second a unit is sent after a burst, the firmware stalls when
+# flooded. Changes made meanwhile are merged into the next frame.
+COMMAND_RATE = 1.0
+COMMAND_BURST = 5
+# Pending changes a power off makes pointless, it skips the queue.
+PREEMPTED_BY_POWER_OFF = frozenset(
+    {"fanMode", "flowHorizontalMode", "flowVerticalMode"}
+)
+
+# DeviceState fields shown by the entities, each entity subscribes to the
+# ones it reads and is only written when one of them changes.
+STATE_FIELDS = (
+    "power",
+    "mode",
+    "fanMode",
+    "desiredTemperature",
+    "indoorTemperature",
+    "temperatureScale",
+    "flowHorizontalMode",
+    "flowVerticalMode",
+    "display",
+)
 
 _LOGGER: logging.Logger = logging.getLogger(__package__)
 
@@ -33,39 +83,526 @@ class UpdateCoordinator(DataUpdateCoordinator):
 
     state: DeviceState = None
 
-    def __init__(self, hass: HomeAssistant, ip: str) -> None:
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        ip: str,
+        port: int = DEFAULT_PORT,
+        coalesce_window: float = DEFAULT_COALESCE_WINDOW,
+        reconcile: str = DEFAULT_RECONCILE,
+        heartbeat_misses: int = DEFAULT_HEARTBEAT_MISSES,
+        scan_interval: timedelta = SCAN_INTERVAL,
+        cooldown: float = DEFAULT_COOLDOWN,
+    ) -> None:
         """Initialize."""
         self._ip = ip
-        self._api = HomeEasyLibLocal(hass.loop, self._update_callback)
+        self._port = port
+        self.connection = async_get_hub(hass).async_acquire(
+            ip, port, self._update_callback, self._connection_changed
+        )
+        self.connection.async_set_miss_threshold(
+            self._update_callback, heartbeat_misses
+        )
+        self._scheduler = async_get_hub(hass).scheduler
         self.platforms = []
-        self._connected = False
+        self.coalesce_window = coalesce_window
+        self.reconcile = reconcile
+        self.scan_interval = scan_interval
+        self._pending_changes: dict = {}
+        # Callers waiting for their changes to go out, with the fields not
+        # superseded by a later call yet.
+        self._queued: list[tuple[set[str], asyncio.Future]] = []
+        self._pending_send: asyncio.Task = None
+        self._urgent = asyncio.Event()
+        self._bucket = TokenBucket(COMMAND_RATE, COMMAND_BURST, hass.loop.time())
+        self._send_lock = asyncio.Lock()
+        # Fields the unit should report, every frame sent carries them. They are
+        # dropped once reported back unless the policy enforces them.
+        self._desired: dict = {}
+        self._attempts: dict[str, int] = {}
+        self._sent_at = 0.0
+        self._confirmations: list[tuple[dict, asyncio.Future]] = []
+        self._shown: DeviceState = None
+        self._command_until = 0.0
+        self._fields: dict = None
+        # Fields changed by the update being published, None for all of them.
+        self._changed: set[str] = None
+        self.stale = False
+        self._on_close: list[CALLBACK_TYPE] = []
+        self.capture: CaptureWriter = None
 
-        super().__init__(
-            hass,
-            _LOGGER,
-            name=DOMAIN,
-            request_refresh_debouncer=Debouncer(
+        # Built outside the entry: its unload callbacks also run when a single
+        # platform is unloaded, which must not shut polling down. The entry
+        # closes the coordinator itself once fully unloaded.
+        entry = current_entry.get()
+        token = current_entry.set(None)
+        try:
+            super().__init__(
                 hass,
                 _LOGGER,
-                cooldown=60,
-                immediate=False,
-                function=self.async_refresh,
-            ),
+                name=DOMAIN,
+                update_interval=scan_interval,
+                request_refresh_debouncer=Debouncer(
+                    hass,
+                    _LOGGER,
+                    cooldown=cooldown,
+                    immediate=False,
+                    function=self.async_refresh,
+                ),
+            )
+        finally:
+            current_entry.reset(token)
+        self.config_entry = entry
+
+    @property
+    def shown_state(self) -> DeviceState:
+        """Return the reported state with the changes awaiting confirmation."""
+        return self.state if self._shown is None else self._shown
+
+    @property
+    def commanding(self) -> bool:
+        """Return True while commands are queued or not confirmed yet."""
+        return bool(
+            self._queued
+            or self._differing()
+            or self.hass.loop.time() < self._command_until
         )
 
+    @callback
+    def _schedule_refresh(self) -> None:
+        """Let the hub's scheduler poll once the interval passed."""
+        if self.update_interval is None:
+            return
+        if self.config_entry and self.config_entry.pref_disable_polling:
+            return
+        self._scheduler.async_schedule(self, self.update_interval.total_seconds())
+
+    def _async_unsub_refresh(self) -> None:
+        """Cancel the scheduled poll."""
+        super()._async_unsub_refresh()
+        self._scheduler.async_unschedule(self)
+
+    @callback
+    def async_schedule_first_refresh(self) -> None:
+        """Poll a freshly set up unit, right away unless a state is shown."""
+        delay = 0.0
+        if self.state is not None:
+            delay = random.uniform(0, STARTUP_SPREAD.total_seconds())
+        self._scheduler.async_schedule(self, delay, jitter=False)
+
+    async def async_poll(self) -> None:
+        """Refresh when the scheduler gets to it."""
+        await self._async_refresh(log_failures=True, scheduled=True)
+
     async def _async_update_data(self):
         """Update data via library."""
-        if not self._connected:
-            await self._api.connect(self._ip)
-            self._connected = True
+        recovered = not self.last_update_success
+        try:
+            # Waiting for the reply keeps the scheduler's slot taken, whether
+            # a unit that stays silent is gone is up to the heartbeat.
+            with suppress(TimeoutError):
+                await self.connection.async_fetch_state()
+        except Exception as err:
+            self._changed = None
+            if self._shutdown_requested:
+                # Closed while polling, nobody is left to tell.
+                return self.data
+            raise UpdateFailed(f"Unable to reach {self._ip}: {err}") from err
+        # The reply arrives as a push, a poll by itself changes nothing unless
+        # it brings the entities back.
+        self._changed = None if recovered else set()
+        return self.data
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update the listeners subscribed to the fields that changed."""
+        changed, self._changed = self._changed, None
+        if self.capture is not None and self.shown_state is not None:
+            self.capture.async_record(STATE, self.shown_state.raw)
+        for update_callback, context in list(self._listeners.values()):
+            if changed is None or context is None or not changed.isdisjoint(context):
+                update_callback()
+
+    def _connection_changed(self, state: ConnectionState):
+        """Mark entities unavailable while the link is down."""
+        if state == ConnectionState.BACKOFF and self.last_update_success:
+            self.last_update_success = False
+            self.async_update_listeners()
+
+    async def async_adopt(self):
+        """Take over a link and state verified by the config flow.
+
+        Return True if there was one, no status round-trip is needed then.
+        """
+        hub = async_get_hub(self.hass)
+        await hub.async_end_lease(self._ip, self._port)
+        if not self.connection.connected or self.connection.last_state is None:
+            return False
+        self.state = self.connection.last_state
+        self._fields = _fields(self.shown_state)
+        self._adapt_update_interval()
+        self.async_set_updated_data(self.state)
+        return True
+
+    async def async_restore(self):
+        """Show the last known state until the unit answers.
+
+        Return True if there was one, entities report it as assumed.
+        """
+        if self.config_entry is None:
+            return False
+        store = async_get_store(self.hass)
+        await store.async_load()
+        state = store.async_get(self.config_entry.entry_id)
+        if state is None:
+            return False
+        self.state = state
+        self._fields = _fields(self.shown_state)
+        self.stale = True
+        self._adapt_update_interval()
+        self.async_set_updated_data(state)
+        return True
+
+    @callback
+    def async_apply_options(self, options) -> None:
+        """Apply entry options to the running coordinator and link."""
+        self.coalesce_window = options.get(
+            CONF_COALESCE_WINDOW, DEFAULT_COALESCE_WINDOW
+        )
+        self.reconcile = options.get(CONF_RECONCILE, DEFAULT_RECONCILE)
+        self.connection.async_set_miss_threshold(
+            self._update_callback,
+            options.get(CONF_HEARTBEAT_MISSES, DEFAULT_HEARTBEAT_MISSES),
+        )
+        self.scan_interval = timedelta(
+            seconds=options.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL)
+        )
+        self._debounced_refresh.cooldown = options.get(CONF_COOLDOWN, DEFAULT_COOLDOWN)
+        interval = self.update_interval
+        self._adapt_update_interval()
+        if self.update_interval != interval and self._listeners:
+            self._schedule_refresh()
+        self._async_set_capture(options.get(CONF_CAPTURE, False))
+
+    @callback
+    def _async_set_capture(self, enabled: bool) -> None:
+        """Start or stop capturing the traffic of the unit."""
+        if enabled and self.capture is None and self.config_entry is not None:
+            self.capture = CaptureWriter(
+                self.hass, capture_path(self.hass, self.config_entry.entry_id)
+            )
+        elif not enabled and self.capture is not None:
+            capture, self.capture = self.capture, None
+            self.hass.async_create_task(capture.async_close())
 
-        await self._api.request_status_async()
+    @callback
+    def async_on_close(self, func: CALLBACK_TYPE) -> None:
+        """Call func when the coordinator is closed."""
+        self._on_close.append(func)
+
+    async def async_close(self):
+        """Stop polling and sending, then release the link to the unit.
+
+        Callers still waiting for their changes get an error, nothing is left
+        scheduled on the loop. Closing twice is harmless.
+        """
+        while self._on_close:
+            self._on_close.pop()()
+        await self.async_shutdown()
+        if self._pending_send is not None:
+            self._pending_send.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._pending_send
+            self._pending_send = None
+        for _, queued in self._queued:
+            if not queued.done():
+                queued.set_exception(HomeAssistantError(f"{self._ip} was unloaded"))
+        for _, confirmed in self._confirmations:
+            if not confirmed.done():
+                confirmed.set_result(False)
+        self._queued = []
+        self._confirmations = []
+        self._pending_changes = {}
+        if self.capture is not None:
+            capture, self.capture = self.capture, None
+            await capture.async_close()
+        await async_get_hub(self.hass).async_release(
+            self._ip, self._port, self._update_callback
+        )
+
+    @property
+    def desired(self) -> dict:
+        """Return the fields the unit is being driven to."""
+        return self._desired
 
     async def _update_callback(self, state):
         """Update data via library."""
+        if self.capture is not None:
+            self.capture.async_record(FRAME, state.raw)
         self.state = state
+        if self._desired:
+            self._reconcile(state)
+        self._update_shown(track=not self.stale and self.last_update_success)
+        self.stale = False
+        if self.config_entry is not None:
+            async_get_store(self.hass).async_set(self.config_entry.entry_id, state)
+        self._adapt_update_interval()
         self.async_set_updated_data(state)
 
-    async def send(self, state):
-        """Send state to device."""
-        await self._api.send(state)
+    def _adapt_update_interval(self):
+        """Pick the polling fallback interval for what the unit is doing."""
+        if self.hass.loop.time() < self._command_until or self._differing():
+            self.update_interval = COMMAND_SCAN_INTERVAL
+        elif self.state is not None and not self.state.power:
+            self.update_interval = OFF_SCAN_INTERVAL
+        else:
+            self.update_interval = self.scan_interval
+
+    def _differing(self) -> dict:
+        """Return the desired fields the unit does not report yet."""
+        if self.state is None:
+            return {}
+        return {
+            field: value
+            for field, value in self._desired.items()
+            if getattr(self.state, field) != value
+        }
+
+    @callback
+    def _reconcile(self, state: DeviceState) -> None:
+        """Compare a reported state with the desired one.
+
+        Reported fields are confirmed, the others are sent again once the last
+        frame had time to be reported back, until their retries run out.
+        """
+        for field in self._desired.keys() - self._differing().keys():
+            self._attempts.pop(field, None)
+            if self.reconcile != RECONCILE_ENFORCE:
+                del self._desired[field]
+        self._resolve_confirmations()
+        if (
+            self.reconcile == RECONCILE_OFF
+            or self._pending_send is not None
+            or not self.connection.connected
+            or self.hass.loop.time() - self._sent_at
+            < RECONCILE_DELAY.total_seconds()
+        ):
+            return
+        differing = self._differing()
+        exhausted = set()
+        for field in differing:
+            self._attempts[field] = self._attempts.get(field, 0) + 1
+            if self._attempts[field] > RECONCILE_RETRIES:
+                exhausted.add(field)
+        if exhausted:
+            _LOGGER.warning(
+                "%s keeps reporting %s, giving up", self._ip, ", ".join(exhausted)
+            )
+            self._drop(exhausted)
+        if differing.keys() - exhausted:
+            _LOGGER.debug("Reconciling %s on %s", differing, self._ip)
+            self._pending_send = self.hass.async_create_task(self._async_flush())
+
+    @callback
+    def _update_shown(self, track: bool = True) -> None:
+        """Apply the desired and pending changes to the shown state.
+
+        Unless track is False the fields that changed on the way are recorded
+        for the next listener update.
+        """
+        changes = {**self._desired, **self._pending_changes}
+        if changes:
+            shown = self.state.copy()
+            for field, value in changes.items():
+                setattr(shown, field, value)
+            self._shown = shown
+        else:
+            self._shown = None
+        fields = _fields(self.shown_state)
+        if track and self._fields is not None:
+            self._changed = {
+                field for field, value in fields.items() if self._fields[field] != value
+            }
+        self._fields = fields
+
+    @callback
+    def _resolve_confirmations(self) -> None:
+        """Resolve the commands whose fields were all reported back."""
+        waiting = []
+        for expected, confirmed in self._confirmations:
+            if confirmed.done():
+                continue
+            if all(
+                getattr(self.state, field) == value for field, value in expected.items()
+            ):
+                confirmed.set_result(True)
+            else:
+                waiting.append((expected, confirmed))
+        self._confirmations = waiting
+
+    @callback
+    def _drop(self, fields) -> None:
+        """Stop driving the fields and fail the commands waiting for them."""
+        for field in fields:
+            self._desired.pop(field, None)
+            self._attempts.pop(field, None)
+        for expected, confirmed in self._confirmations:
+            if not confirmed.done() and not expected.keys().isdisjoint(fields):
+                confirmed.set_result(False)
+
+    @callback
+    def _rollback(self, expected: dict) -> None:
+        """Show the reported values of changes the unit never confirmed."""
+        self._drop(
+            field
+            for field, value in expected.items()
+            if self._desired.get(field) == value
+        )
+        self._update_shown()
+        self.async_update_listeners()
+
+    async def send(self, **changes):
+        """Send the changed fields to device.
+
+        The changes are shown right away, the live state is never written. They
+        are applied to a copy of the latest reported state right before the
+        frame goes out. Changes made within the coalescing window or while the
+        unit is rate limited are merged into a single frame, every caller waits
+        for the unit to report them back and gets an error if it does not in
+        time. Callers whose changes were all superseded before going out return
+        right away, a power off skips the queue and drops pending fan and swing
+        changes.
+
+        Unless reconciliation is off, changes made while the link is down are
+        sent once it is back and changes not reported back are sent again.
+        """
+        if self.state is None:
+            raise HomeAssistantError(f"State of {self._ip} is not known yet")
+        # Values the frame cannot carry are refused before anything is queued.
+        scratch = self.shown_state.copy()
+        for field, value in changes.items():
+            try:
+                setattr(scratch, field, value)
+            except (KeyError, TypeError, ValueError) as err:
+                raise HomeAssistantError(
+                    f"{self._ip} cannot be sent {field} {value}"
+                ) from err
+        if changes.get("power") is False:
+            self._supersede(PREEMPTED_BY_POWER_OFF)
+            self._urgent.set()
+        self._supersede(changes)
+        self._pending_changes.update(changes)
+        queued = self.hass.loop.create_future()
+        self._queued.append((set(changes), queued))
+        metrics = self.connection.metrics
+        metrics.queue_depth = len(self._queued)
+        metrics.max_queue_depth = max(metrics.max_queue_depth, metrics.queue_depth)
+        self._update_shown()
+        self.async_update_listeners()
+        if self._pending_send is None:
+            self._pending_send = self.hass.async_create_task(self._async_flush())
+        sent = await asyncio.shield(queued)
+        if sent is None:
+            return
+        expected, confirmed = sent
+        try:
+            async with asyncio.timeout(CONFIRM_TIMEOUT.total_seconds()):
+                ok = await asyncio.shield(confirmed)
+        except TimeoutError:
+            if self.reconcile == RECONCILE_OFF:
+                self._rollback(expected)
+            raise HomeAssistantError(
+                f"{self._ip} did not confirm {', '.join(expected)} in time"
+            ) from None
+        if not ok:
+            raise HomeAssistantError(f"{self._ip} did not apply {', '.join(expected)}")
+
+    @callback
+    def _supersede(self, fields) -> None:
+        """Drop pending changes of the fields, releasing callers left with none."""
+        metrics = self.connection.metrics
+        for field in fields:
+            self._pending_changes.pop(field, None)
+        queued = []
+        for remaining, waiter in self._queued:
+            remaining.difference_update(fields)
+            if remaining:
+                queued.append((remaining, waiter))
+            elif not waiter.done():
+                metrics.dropped += 1
+                waiter.set_result(None)
+        self._queued = queued
+        metrics.queue_depth = len(queued)
+
+    async def _async_wait_urgent(self, timeout: float) -> None:
+        """Sleep, waking up early for a change that skips the queue."""
+        with suppress(TimeoutError):
+            async with asyncio.timeout(timeout):
+                await self._urgent.wait()
+
+    async def _async_flush(self):
+        """Send the pending changes once the coalescing window is over.
+
+        Waits for the rate limiter, the callers whose changes went out get the
+        values expected back and a future resolved with whether the unit
+        reported them.
+        """
+        await self._async_wait_urgent(self.coalesce_window)
+        while not self._urgent.is_set():
+            delay = self._bucket.delay(self.hass.loop.time())
+            if delay <= 0:
+                break
+            self.connection.metrics.throttled += 1
+            await self._async_wait_urgent(delay)
+        self._bucket.take(self.hass.loop.time())
+        self._urgent.clear()
+        changes = self._pending_changes
+        queued = self._queued
+        self._pending_changes = {}
+        self._queued = []
+        self._pending_send = None
+        self.connection.metrics.queue_depth = 0
+        # Frames go out one at a time, each built on top of the state reported
+        # when it is its turn.
+        async with self._send_lock:
+            state = self.state.copy()
+            for field, value in {**self._desired, **changes}.items():
+                setattr(state, field, value)
+            expected = {field: getattr(state, field) for field in changes}
+            for field in expected:
+                self._attempts.pop(field, None)
+            # A newer value supersedes whatever was still awaited for the field.
+            for older, _ in self._confirmations:
+                for field, value in expected.items():
+                    if older.get(field, value) != value:
+                        del older[field]
+            self._desired.update(expected)
+            confirmed = self.hass.loop.create_future()
+            self._confirmations.append((expected, confirmed))
+            self._resolve_confirmations()
+            try:
+                await self.connection.async_send(state)
+            except Exception as err:  # pylint: disable=broad-except
+                if self.reconcile == RECONCILE_OFF:
+                    self._rollback(expected)
+                    for _, waiter in queued:
+                        if not waiter.done():
+                            waiter.set_exception(err)
+                    return
+                _LOGGER.debug("Sending to %s failed, will retry: %s", self._ip, err)
+            else:
+                self._sent_at = self.hass.loop.time()
+                self._command_until = (
+                    self._sent_at + COMMAND_SETTLE_TIME.total_seconds()
+                )
+        for _, waiter in queued:
+            if not waiter.done():
+                waiter.set_result((expected, confirmed))
+        self._adapt_update_interval()
+        if self._listeners:
+            self._schedule_refresh()
+
+
+def _fields(state: DeviceState) -> dict:
+    """Return the values of the fields shown by the entities."""
+    return {field: getattr(state, field) for field in STATE_FIELDS}
@@ -0,0 +1,39 @@
+"""Diagnostics support for Home Easy HVAC Local."""
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .coordinator import STATE_FIELDS
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return the link health and latencies of a unit."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    connection = coordinator.connection
+    state = coordinator.state
+    return {
+        "entry": {"data": dict(entry.data), "options": dict(entry.options)},
+        "connection": {
+            "state": connection.state,
+            "connects": connection.connects,
+            "disconnects": connection.disconnects,
+            "failures": connection.failures,
+        },
+        "coordinator": {
+            "last_update_success": coordinator.last_update_success,
+            "update_interval": coordinator.update_interval.total_seconds(),
+            "stale": coordinator.stale,
+            "reconcile": coordinator.reconcile,
+            "desired": dict(coordinator.desired),
+        },
+        "state": (
+            None
+            if state is None
+            else {field: getattr(state, field) for field in STATE_FIELDS}
+        ),
+        "metrics": connection.metrics.as_dict(),
+    }
@@ -0,0 +1,92 @@
+"""Subnet discovery for Home Easy HVAC Local."""
+import asyncio
+from collections.abc import Iterable
+from ipaddress import IPv4Network, ip_interface, ip_network
+import logging
+
+from homeassistant.components import network
+from homeassistant.core import HomeAssistant
+
+from .codec import FRAME_SIZE, HEADER, STATUS_REQUEST
+from .const import DEFAULT_PORT
+
+DISCOVERY_TIMEOUT = 1.0
+DISCOVERY_CONCURRENCY = 256
+# Never sweep more than a /22 (1022 hosts) per adapter by default.
+MAX_DEFAULT_PREFIX = 22
+# Nor more than a /20 (4094 hosts) per subnet given by the user.
+MAX_SUBNET_SIZE = 2 ** (32 - 20)
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+
+def valid_subnet(value: str) -> str:
+    """Return the subnet, raise ValueError if invalid or too large to sweep."""
+    net = ip_network(value.strip(), strict=False)
+    if net.num_addresses > MAX_SUBNET_SIZE:
+        raise ValueError(f"{value} is larger than {MAX_SUBNET_SIZE} addresses")
+    return str(net)
+
+
+async def async_probe(
+    host: str, port: int = DEFAULT_PORT, timeout: float = DISCOVERY_TIMEOUT
+) -> bool:
+    """Return True if a Home Easy compatible unit answers at the address."""
+    writer = None
+    try:
+        async with asyncio.timeout(timeout):
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.write(STATUS_REQUEST)
+            await writer.drain()
+            frame = await reader.readexactly(FRAME_SIZE)
+    except Exception:  # pylint: disable=broad-except
+        return False
+    finally:
+        if writer is not None:
+            writer.close()
+    return frame[: len(HEADER)] == HEADER
+
+
+async def async_scan(
+    networks: Iterable[str],
+    port: int = DEFAULT_PORT,
+    *,
+    exclude: Iterable[str] = (),
+    concurrency: int = DISCOVERY_CONCURRENCY,
+    timeout: float = DISCOVERY_TIMEOUT,
+) -> list[str]:
+    """Probe every host of the networks and return the ones with a unit.
+
+    Raise ValueError for an invalid network or one larger than MAX_SUBNET_SIZE.
+    """
+    excluded = set(exclude)
+    hosts: dict[str, None] = {}
+    for net in [valid_subnet(net) for net in networks]:
+        for host in ip_network(net).hosts():
+            if str(host) not in excluded:
+                hosts.setdefault(str(host))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _probe(host: str) -> bool:
+        async with semaphore:
+            return await async_probe(host, port, timeout)
+
+    results = await asyncio.gather(*(_probe(host) for host in hosts))
+    found = [host for host, ok in zip(hosts, results) if ok]
+    _LOGGER.debug("Scanned %d hosts, found %s", len(hosts), found)
+    return found
+
+
+async def async_default_networks(hass: HomeAssistant) -> list[str]:
+    """Return the IPv4 networks of the enabled adapters."""
+    networks = []
+    for adapter in await network.async_get_adapters(hass):
+        if not adapter["enabled"]:
+            continue
+        for address in adapter["ipv4"]:
+            prefix = max(address["network_prefix"], MAX_DEFAULT_PREFIX)
+            interface = ip_interface(f"{address['address']}/{prefix}")
+            if interface.is_loopback:
+                continue
+            networks.append(str(IPv4Network(interface.network)))
+    return networks
@@ -1,19 +1,48 @@
 """BlueprintEntity class"""
+from homeassistant.core import callback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from .const import CLIMATE, CONF_IP, DOMAIN, ICON, NAME, VERSION, ATTRIBUTION
 
 
 class Entity(CoordinatorEntity):
+    # DeviceState fields the entity shows, it is written when one changes.
+    fields: frozenset[str] = frozenset()
+
     def __init__(self, coordinator, config_entry):
-        super().__init__(coordinator)
+        super().__init__(coordinator, self.fields)
         self.config_entry = config_entry
 
+    async def async_added_to_hass(self) -> None:
+        """Compute the attributes before the first state write."""
+        await super().async_added_to_hass()
+        self._async_update_attrs()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Recompute the attributes once per update, then write the state."""
+        self._async_update_attrs()
+        super()._handle_coordinator_update()
+
+    @callback
+    def _async_update_attrs(self) -> None:
+        """Set the _attr_* values shown for the coordinator state."""
+
     @property
     def should_poll(self) -> bool:
         """No need to poll. Coordinator notifies entity of updates."""
         return False
 
+    @property
+    def available(self) -> bool:
+        """Return True once a state is known."""
+        return super().available and self.coordinator.state is not None
+
+    @property
+    def assumed_state(self) -> bool:
+        """Return True while showing the stored state of an unreachable unit."""
+        return self.coordinator.stale
+
     @property
     def unique_id(self):
         """Return a unique ID to use for this entity."""
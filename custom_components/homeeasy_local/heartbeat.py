@@ -0,0 +1,72 @@
+"""Heartbeat timer wheel for Home Easy HVAC Local."""
+from datetime import datetime, timedelta
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+
+from .connection import Connection
+from .const import DOMAIN
+from .scheduler import PollScheduler
+
+# Every link is checked once per interval, spread over the slots of the wheel.
+HEARTBEAT_INTERVAL = timedelta(seconds=2)
+HEARTBEAT_SLOTS = 8
+
+
+class Heartbeat:
+    """Beat every link from a single timer.
+
+    Links are spread over the slots of a wheel turning once per interval, each
+    tick only visits the links of one slot. Nothing runs while there are none.
+    Probes of silent links are queued with the polls, so they share their
+    in-flight cap.
+    """
+
+    def __init__(self, hass: HomeAssistant, scheduler: PollScheduler) -> None:
+        """Initialize."""
+        self._hass = hass
+        self._scheduler = scheduler
+        self._tick_interval = HEARTBEAT_INTERVAL / HEARTBEAT_SLOTS
+        self._slots: list[set[Connection]] = [set() for _ in range(HEARTBEAT_SLOTS)]
+        self._index = 0
+        self._unsub: CALLBACK_TYPE | None = None
+
+    @callback
+    def async_add(self, connection: Connection) -> None:
+        """Start beating a link, in the least busy slot."""
+        min(self._slots, key=len).add(connection)
+        if self._unsub is None:
+            self._unsub = async_track_time_interval(
+                self._hass,
+                self._tick,
+                self._tick_interval,
+                name=f"{DOMAIN} heartbeat",
+                cancel_on_shutdown=True,
+            )
+
+    @callback
+    def async_remove(self, connection: Connection) -> None:
+        """Stop beating a link."""
+        for slot in self._slots:
+            slot.discard(connection)
+        self._scheduler.async_unschedule(connection)
+        if self._unsub is not None and not any(self._slots):
+            self._unsub()
+            self._unsub = None
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop beating every link."""
+        for slot in self._slots:
+            slot.clear()
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+
+    @callback
+    def _tick(self, _now: datetime) -> None:
+        slot = self._slots[self._index]
+        self._index = (self._index + 1) % len(self._slots)
+        for connection in list(slot):
+            if connection.async_heartbeat():
+                self._scheduler.async_schedule(connection, 0, jitter=False)
@@ -0,0 +1,152 @@
+"""Shared link registry for Home Easy HVAC Local."""
+from collections.abc import Callable
+from datetime import timedelta
+from functools import partial
+import logging
+
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import Event, HassJob, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+from .connection import Connection, ConnectionState
+from .const import DOMAIN_DATA
+from .heartbeat import Heartbeat
+from .scheduler import PollScheduler
+
+# How long a link verified by the config flow waits to be adopted by setup.
+HANDOVER_TIMEOUT = timedelta(minutes=1)
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+
+class Hub:
+    """Own the links to every unit across config entries.
+
+    Each unit gets exactly one connection no matter how many entries point
+    at it, frames are routed to the subscribers of the unit they came from.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize."""
+        self._hass = hass
+        self._connections: dict[tuple[str, int], Connection] = {}
+        self._subscribers: dict[tuple[str, int], list[tuple]] = {}
+        self._leases: dict[tuple[str, int], Callable[[], None]] = {}
+        self.scheduler = PollScheduler(hass)
+        self.heartbeat = Heartbeat(hass, self.scheduler)
+        self._unsub_stop = hass.bus.async_listen_once(
+            EVENT_HOMEASSISTANT_STOP, self._async_stop
+        )
+
+    @property
+    def connections(self) -> dict[tuple[str, int], Connection]:
+        """Return the open links keyed by address."""
+        return self._connections
+
+    @callback
+    def async_acquire(
+        self, ip: str, port: int, update_callback, state_callback
+    ) -> Connection:
+        """Return the link to a unit and subscribe to its frames."""
+        key = (ip, port)
+        connection = self._connections.get(key)
+        if connection is None:
+            connection = Connection(
+                self._hass,
+                ip,
+                port,
+                partial(self._async_dispatch_update, key),
+                partial(self._dispatch_state, key),
+            )
+            self._connections[key] = connection
+            self._subscribers[key] = []
+            self.heartbeat.async_add(connection)
+        self._subscribers[key].append((update_callback, state_callback))
+        return connection
+
+    async def async_release(self, ip: str, port: int, update_callback) -> None:
+        """Unsubscribe and close the link once nobody uses it."""
+        key = (ip, port)
+        subscribers = self._subscribers.get(key)
+        if subscribers is None:
+            return
+        subscribers[:] = [sub for sub in subscribers if sub[0] != update_callback]
+        connection = self._connections[key]
+        connection.async_set_miss_threshold(update_callback, None)
+        if subscribers:
+            return
+        del self._subscribers[key]
+        del self._connections[key]
+        self.heartbeat.async_remove(connection)
+        await connection.async_disconnect()
+
+    @callback
+    def async_lease(self, ip: str, port: int) -> Connection:
+        """Return the link to a unit, kept open for a while for setup to adopt."""
+        key = (ip, port)
+        if (cancel := self._leases.pop(key, None)) is not None:
+            cancel()
+        else:
+            self.async_acquire(ip, port, self._async_lease_update, self._lease_state)
+        self._leases[key] = async_call_later(
+            self._hass,
+            HANDOVER_TIMEOUT,
+            HassJob(
+                partial(self._async_expire_lease, key),
+                f"{DOMAIN_DATA} lease {ip}:{port}",
+                cancel_on_shutdown=True,
+            ),
+        )
+        return self._connections[key]
+
+    async def async_end_lease(self, ip: str, port: int) -> None:
+        """Release a link leased to the config flow."""
+        if (cancel := self._leases.pop((ip, port), None)) is not None:
+            cancel()
+            await self.async_release(ip, port, self._async_lease_update)
+
+    async def async_close(self) -> None:
+        """Close every link."""
+        if self._unsub_stop is not None:
+            self._unsub_stop()
+            self._unsub_stop = None
+        for cancel in self._leases.values():
+            cancel()
+        self._leases.clear()
+        self._subscribers.clear()
+        self.heartbeat.async_stop()
+        self.scheduler.async_stop()
+        connections, self._connections = self._connections, {}
+        for connection in connections.values():
+            await connection.async_disconnect()
+
+    async def _async_stop(self, _event: Event) -> None:
+        """Close every link when Home Assistant stops."""
+        self._unsub_stop = None
+        await self.async_close()
+
+    async def _async_expire_lease(self, key: tuple[str, int], _now) -> None:
+        if self._leases.pop(key, None) is not None:
+            await self.async_release(*key, self._async_lease_update)
+
+    async def _async_lease_update(self, state) -> None:
+        """Frames are kept on the connection until setup adopts it."""
+
+    def _lease_state(self, state: ConnectionState) -> None:
+        """The config flow does not follow the link state."""
+
+    async def _async_dispatch_update(self, key: tuple[str, int], state) -> None:
+        for update_callback, _ in list(self._subscribers.get(key, ())):
+            await update_callback(state)
+
+    def _dispatch_state(self, key: tuple[str, int], state: ConnectionState) -> None:
+        for _, state_callback in list(self._subscribers.get(key, ())):
+            state_callback(state)
+
+
+@callback
+def async_get_hub(hass: HomeAssistant) -> Hub:
+    """Return the hub, creating it on first use."""
+    if (hub := hass.data.get(DOMAIN_DATA)) is None:
+        hub = hass.data[DOMAIN_DATA] = Hub(hass)
+    return hub
@@ -0,0 +1,89 @@
+"""Per-unit latency and error metrics for Home Easy HVAC Local."""
+import math
+
+# Buckets are powers of two milliseconds, the last one catches up to ~4.6 h.
+BUCKETS = 25
+
+
+class Histogram:
+    """Durations in milliseconds, bucketed by powers of two.
+
+    Cheap enough to feed on every frame, percentiles are bucket upper bounds
+    capped at the largest value seen.
+    """
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._buckets = [0] * BUCKETS
+
+    def add(self, value: float) -> None:
+        """Record a duration in milliseconds."""
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        index = math.ceil(math.log2(value)) if value > 1 else 0
+        self._buckets[min(index, BUCKETS - 1)] += 1
+
+    @property
+    def mean(self) -> float | None:
+        """Return the mean duration."""
+        return self.total / self.count if self.count else None
+
+    def percentile(self, percent: float) -> float | None:
+        """Return an upper bound of the percentile."""
+        if not self.count:
+            return None
+        rank = math.ceil(self.count * percent / 100)
+        seen = 0
+        for index, count in enumerate(self._buckets):
+            seen += count
+            if seen >= rank:
+                return min(float(2**index), self.max)
+        return self.max
+
+    def as_dict(self) -> dict:
+        """Return a summary for diagnostics."""
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max,
+            "buckets": {
+                f"<={2**index}ms": count
+                for index, count in enumerate(self._buckets)
+                if count
+            },
+        }
+
+
+class DeviceMetrics:
+    """Latencies and errors of the link to a unit."""
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self.status_round_trip = Histogram()
+        self.command_confirmation = Histogram()
+        self.push_interval = Histogram()
+        self.timeouts = 0
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.dropped = 0
+        self.throttled = 0
+
+    def as_dict(self) -> dict:
+        """Return a summary for diagnostics."""
+        return {
+            "status_round_trip": self.status_round_trip.as_dict(),
+            "command_confirmation": self.command_confirmation.as_dict(),
+            "push_interval": self.push_interval.as_dict(),
+            "timeouts": self.timeouts,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "dropped": self.dropped,
+            "throttled": self.throttled,
+        }
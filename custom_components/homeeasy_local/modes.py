@@ -0,0 +1,49 @@
+"""Mode tables shared by the climate platform and the services."""
+from homeeasy.DeviceState import HorizontalFlowMode, Mode, VerticalFlowMode
+
+from homeassistant.components.climate.const import HVACMode
+
+SUPPORT_FAN = [
+    "Auto",
+    "Lowest",
+    "Low",
+    "Mid-low",
+    "Mid-high",
+    "High",
+    "Highest",
+    "Quite",
+    "Turbo",
+]
+
+SUPPORT_HVAC = [
+    HVACMode.OFF,
+    HVACMode.AUTO,
+    HVACMode.COOL,
+    HVACMode.DRY,
+    HVACMode.FAN_ONLY,
+    HVACMode.HEAT,
+]
+
+HA_STATE_TO_MODE_MAP = {
+    HVACMode.AUTO: Mode.Auto,
+    HVACMode.COOL: Mode.Cool,
+    HVACMode.DRY: Mode.Dry,
+    HVACMode.FAN_ONLY: Mode.Fan,
+    HVACMode.HEAT: Mode.Heat,
+}
+
+MODE_TO_HA_STATE_MAP = {value: key for key, value in HA_STATE_TO_MODE_MAP.items()}
+
+SWING_MODES = {
+    "Stop": (HorizontalFlowMode.Stop, VerticalFlowMode.Stop),
+    "Horizontal": (HorizontalFlowMode.Swing, VerticalFlowMode.Stop),
+    "Vertical": (HorizontalFlowMode.Stop, VerticalFlowMode.Swing),
+    "Both": (HorizontalFlowMode.Swing, VerticalFlowMode.Swing),
+    "Custom": (HorizontalFlowMode.Stop, VerticalFlowMode.Stop),
+}
+
+SWING_MODE_NAMES = list(SWING_MODES)
+SWING_MODE_CUSTOM = SWING_MODE_NAMES[-1]
+# Reverse lookup of the swing mode from both flow modes, the first name wins
+# for shared pairs like it did when scanning SWING_MODES.
+FLOW_TO_SWING_MODE = {value: key for key, value in reversed(SWING_MODES.items())}
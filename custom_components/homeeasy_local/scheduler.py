@@ -0,0 +1,148 @@
+"""Polling scheduler for Home Easy HVAC Local."""
+from __future__ import annotations
+
+from functools import partial
+import heapq
+from itertools import count
+import random
+from typing import TYPE_CHECKING
+
+from homeassistant.core import CALLBACK_TYPE, HassJob, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_at
+
+from .const import DOMAIN
+
+if TYPE_CHECKING:
+    from .coordinator import UpdateCoordinator
+
+# Polls are moved up to this share of their interval earlier, so units set up
+# or recovered together drift apart instead of polling in lockstep.
+POLL_JITTER = 0.2
+# Status requests waiting for their reply across every unit, the rest queue.
+MAX_INFLIGHT_POLLS = 8
+# Polls due this close together are started by the same timer.
+POLL_RESOLUTION = 0.5
+
+
+class PollScheduler:
+    """Poll every unit from a single timer.
+
+    Coordinators hand in the delay of their next poll, it is jittered and
+    queued. The heartbeat queues the probes of silent links the same way,
+    anything with async_poll and commanding works. Due polls run at most
+    MAX_INFLIGHT_POLLS at a time, units with commands in flight go first.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize."""
+        self._hass = hass
+        self._max_inflight = MAX_INFLIGHT_POLLS
+        self._due: dict[UpdateCoordinator, float] = {}
+        self._heap: list[tuple[float, int, UpdateCoordinator]] = []
+        self._order = count()
+        self._ready: list[UpdateCoordinator] = []
+        self._running: set[UpdateCoordinator] = set()
+        self._timer_at: float = None
+        self._unsub: CALLBACK_TYPE | None = None
+
+    @property
+    def inflight(self) -> int:
+        """Return the number of polls waiting for their reply."""
+        return len(self._running)
+
+    @callback
+    def async_schedule(
+        self, coordinator: UpdateCoordinator, delay: float, jitter: bool = True
+    ) -> None:
+        """Poll a unit after the delay, replacing its previous poll."""
+        self.async_unschedule(coordinator)
+        if jitter:
+            delay *= 1 - random.random() * POLL_JITTER
+        due = self._hass.loop.time() + delay
+        self._due[coordinator] = due
+        heapq.heappush(self._heap, (due, next(self._order), coordinator))
+        if len(self._heap) > 2 * len(self._due) + 64:
+            # Every push reschedules its unit, drop the stale entries before
+            # they outnumber the live ones.
+            self._heap = [
+                (due, next(self._order), coordinator)
+                for coordinator, due in self._due.items()
+            ]
+            heapq.heapify(self._heap)
+        if self._timer_at is None or due < self._timer_at:
+            self._arm(due)
+
+    @callback
+    def async_unschedule(self, coordinator: UpdateCoordinator) -> None:
+        """Forget the next poll of a unit, the heap entry goes stale."""
+        self._due.pop(coordinator, None)
+        if coordinator in self._ready:
+            self._ready.remove(coordinator)
+        if not self._due:
+            self._heap.clear()
+            self._cancel_timer()
+
+    @callback
+    def async_stop(self) -> None:
+        """Forget every poll."""
+        self._due.clear()
+        self._heap.clear()
+        self._ready.clear()
+        self._cancel_timer()
+
+    def _arm(self, when: float) -> None:
+        self._cancel_timer()
+        self._timer_at = when
+        self._unsub = async_call_at(
+            self._hass,
+            HassJob(
+                partial(self._fire, when),
+                f"{DOMAIN} poll",
+                cancel_on_shutdown=True,
+            ),
+            when,
+        )
+
+    def _cancel_timer(self) -> None:
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+        self._timer_at = None
+
+    @callback
+    def _fire(self, when: float, _now) -> None:
+        """Move the polls due by the time the timer was set for to the queue."""
+        self._unsub = None
+        self._timer_at = None
+        heap = self._heap
+        while heap and heap[0][0] <= when + POLL_RESOLUTION:
+            due, _, coordinator = heapq.heappop(heap)
+            if self._due.get(coordinator) == due:
+                del self._due[coordinator]
+                self._ready.append(coordinator)
+        # Skip over stale entries so the timer is not armed for nothing.
+        while heap and self._due.get(heap[0][2]) != heap[0][0]:
+            heapq.heappop(heap)
+        if heap:
+            self._arm(heap[0][0])
+        self._drain()
+
+    @callback
+    def _drain(self) -> None:
+        """Start queued polls while slots are free, commanded units first."""
+        while self._ready and len(self._running) < self._max_inflight:
+            coordinator = next((c for c in self._ready if c.commanding), self._ready[0])
+            self._ready.remove(coordinator)
+            if coordinator in self._running:
+                continue
+            self._running.add(coordinator)
+            self._hass.async_create_task(
+                self._async_poll(coordinator), f"{DOMAIN} poll"
+            )
+
+    async def _async_poll(self, coordinator: UpdateCoordinator) -> None:
+        try:
+            await coordinator.async_poll()
+        finally:
+            self._running.discard(coordinator)
+            self._drain()
@@ -2,6 +2,7 @@
 from homeeasy.DeviceState import HorizontalFlowMode, VerticalFlowMode
 
 from homeassistant.components.select import SelectEntity
+from homeassistant.core import callback
 
 from .const import DOMAIN, SELECT
 from .entity import Entity
@@ -41,37 +42,39 @@ SUPPORT_VERTICAL = {
     "Bottom": VerticalFlowMode.Bottom,
 }
 
+HORIZONTAL_OPTIONS = list(SUPPORT_HORIZONTAL)
+VERTICAL_OPTIONS = list(SUPPORT_VERTICAL)
+# Reverse lookups from the mode reported by the unit to the option.
+HORIZONTAL_TO_OPTION = {value: key for key, value in SUPPORT_HORIZONTAL.items()}
+VERTICAL_TO_OPTION = {value: key for key, value in SUPPORT_VERTICAL.items()}
+
 
 class HomeEasyHvacLocalVertical(Entity, SelectEntity):
+    fields = frozenset({"flowVerticalMode"})
+    _attr_options = VERTICAL_OPTIONS
+
     @property
     def name(self) -> str:
         """Return the name of the thermostat, if any."""
         return f"{super().name}_{SELECT}_Vertical"
 
-    @property
-    def options(self) -> list[str]:
-        """Return a set of selectable options."""
-        return list(SUPPORT_VERTICAL.keys())
-
     async def async_select_option(self, option: str) -> None:
         """Change the selected option."""
-        state = self.coordinator.state
-        state.flowVerticalMode = SUPPORT_VERTICAL[option]
-        await self.coordinator.send(state)
-
-    @property
-    def current_option(self) -> str:
-        """Return the selected entity option to represent the entity state."""
-        if self.coordinator.state is None:
-            return None
+        await self.coordinator.send(flowVerticalMode=SUPPORT_VERTICAL[option])
 
-        for (key, value) in SUPPORT_VERTICAL.items():
-            if self.coordinator.state.flowVerticalMode == value:
-                return key
-        return None
+    @callback
+    def _async_update_attrs(self) -> None:
+        """Look up the option for the reported mode."""
+        state = self.coordinator.shown_state
+        self._attr_current_option = (
+            None if state is None else VERTICAL_TO_OPTION.get(state.flowVerticalMode)
+        )
 
 
 class HomeEasyHvacLocalHorizontal(Entity, SelectEntity):
+    fields = frozenset({"flowHorizontalMode"})
+    _attr_options = HORIZONTAL_OPTIONS
+
     @property
     def unique_id(self):
         """Return a unique ID to use for this entity."""
@@ -82,24 +85,16 @@ class HomeEasyHvacLocalHorizontal(Entity, SelectEntity):
         """Return the name of the thermostat, if any."""
         return f"{super().name}_{SELECT}_Horizontal"
 
-    @property
-    def options(self) -> list[str]:
-        """Return a set of selectable options."""
-        return list(SUPPORT_HORIZONTAL.keys())
-
     async def async_select_option(self, option: str) -> None:
         """Change the selected option."""
-        state = self.coordinator.state
-        state.flowHorizontalMode = SUPPORT_HORIZONTAL[option]
-        await self.coordinator.send(state)
-
-    @property
-    def current_option(self) -> str:
-        """Return the selected entity option to represent the entity state."""
-        if self.coordinator.state is None:
-            return None
-            
-        for (key, value) in SUPPORT_HORIZONTAL.items():
-            if self.coordinator.state.flowHorizontalMode == value:
-                return key
-        return None
+        await self.coordinator.send(flowHorizontalMode=SUPPORT_HORIZONTAL[option])
+
+    @callback
+    def _async_update_attrs(self) -> None:
+        """Look up the option for the reported mode."""
+        state = self.coordinator.shown_state
+        self._attr_current_option = (
+            None
+            if state is None
+            else HORIZONTAL_TO_OPTION.get(state.flowHorizontalMode)
+        )
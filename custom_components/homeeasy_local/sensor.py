@@ -0,0 +1,106 @@
+"""Diagnostic sensor platform for Home Easy HVAC Local."""
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from homeassistant.components.sensor import (
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.const import EntityCategory, UnitOfTime
+from homeassistant.core import callback
+
+from .connection import Connection
+from .const import DOMAIN, SENSOR
+from .entity import Entity
+
+
+@dataclass(frozen=True, kw_only=True)
+class HomeEasySensorEntityDescription(SensorEntityDescription):
+    """Describe a link health sensor."""
+
+    value_fn: Callable[[Connection], float | int | None]
+
+
+SENSORS = (
+    HomeEasySensorEntityDescription(
+        key="status_round_trip",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda connection: connection.metrics.status_round_trip.percentile(95),
+    ),
+    HomeEasySensorEntityDescription(
+        key="command_confirmation",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda connection: (
+            connection.metrics.command_confirmation.percentile(95)
+        ),
+    ),
+    HomeEasySensorEntityDescription(
+        key="push_interval",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda connection: connection.metrics.push_interval.percentile(50),
+    ),
+    HomeEasySensorEntityDescription(
+        key="timeouts",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda connection: connection.metrics.timeouts,
+    ),
+    HomeEasySensorEntityDescription(
+        key="reconnects",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda connection: connection.disconnects,
+    ),
+)
+
+
+async def async_setup_entry(hass, entry, async_add_devices):
+    """Setup sensor platform."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    async_add_devices(
+        HomeEasyHvacLocalSensor(coordinator, entry, description)
+        for description in SENSORS
+    )
+
+
+class HomeEasyHvacLocalSensor(Entity, SensorEntity):
+    """Latency or error count of the link to a unit, disabled by default."""
+
+    # Metrics move with every frame and every failure.
+    fields = None
+    entity_description: HomeEasySensorEntityDescription
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(self, coordinator, config_entry, description):
+        super().__init__(coordinator, config_entry)
+        self.entity_description = description
+
+    @property
+    def unique_id(self):
+        """Return a unique ID to use for this entity."""
+        return f"{super().unique_id}_{self.entity_description.key}"
+
+    @property
+    def name(self) -> str:
+        """Return the name of the sensor."""
+        return f"{super().name}_{SENSOR}_{self.entity_description.key}"
+
+    @property
+    def available(self) -> bool:
+        """Metrics are known even while the unit is unreachable."""
+        return True
+
+    @property
+    def icon(self):
+        """Return the default icon of the sensor."""
+        return None
+
+    @callback
+    def _async_update_attrs(self) -> None:
+        """Read the metric from the link."""
+        self._attr_native_value = self.entity_description.value_fn(
+            self.coordinator.connection
+        )
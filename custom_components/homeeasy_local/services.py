@@ -0,0 +1,193 @@
+"""Services for Home Easy HVAC Local."""
+import asyncio
+import logging
+
+from homeeasy.DeviceState import FanMode
+
+from homeassistant.components.climate import (
+    ATTR_FAN_MODE,
+    ATTR_HVAC_MODE,
+    ATTR_SWING_MODE,
+    HVACMode,
+)
+from homeassistant.config_entries import SOURCE_INTEGRATION_DISCOVERY
+from homeassistant.const import (
+    ATTR_AREA_ID,
+    ATTR_DEVICE_ID,
+    ATTR_ENTITY_ID,
+    ATTR_TEMPERATURE,
+    ENTITY_MATCH_ALL,
+)
+from homeassistant.core import HomeAssistant, ServiceCall, SupportsResponse
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import (
+    config_validation as cv,
+    discovery_flow,
+    entity_registry as er,
+)
+from homeassistant.helpers.service import async_extract_referenced_entity_ids
+import voluptuous as vol
+
+from .const import (
+    CONF_DISPLAY,
+    CONF_IP,
+    CONF_PORT,
+    CONF_SUBNETS,
+    CONF_TIMEOUT,
+    DEFAULT_BULK_TIMEOUT,
+    DEFAULT_PORT,
+    DOMAIN,
+    MAX_TEMP,
+    MIN_TEMP,
+    SERVICE_BULK_SET,
+    SERVICE_SCAN,
+)
+from .discovery import async_default_networks, async_scan, valid_subnet
+from .modes import HA_STATE_TO_MODE_MAP, SUPPORT_FAN, SWING_MODES
+
+# Units commanded at once by bulk_set, the others wait for a free slot.
+BULK_CONCURRENCY = 32
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+SCAN_SCHEMA = vol.Schema(
+    {
+        vol.Optional(CONF_SUBNETS): vol.All(cv.ensure_list_csv, [valid_subnet]),
+        vol.Optional(CONF_PORT, default=DEFAULT_PORT): cv.port,
+    }
+)
+
+BULK_SET_SCHEMA = vol.All(
+    # A call without a target is refused, entity_id: all targets every unit.
+    cv.has_at_least_one_key(ATTR_ENTITY_ID, ATTR_DEVICE_ID, ATTR_AREA_ID),
+    vol.Schema(
+        {
+            **cv.ENTITY_SERVICE_FIELDS,
+            vol.Optional(ATTR_HVAC_MODE): vol.In([HVACMode.OFF, *HA_STATE_TO_MODE_MAP]),
+            vol.Optional(ATTR_TEMPERATURE): vol.All(
+                vol.Coerce(int), vol.Range(min=MIN_TEMP, max=MAX_TEMP)
+            ),
+            vol.Optional(ATTR_FAN_MODE): vol.In(SUPPORT_FAN),
+            vol.Optional(ATTR_SWING_MODE): vol.In(SWING_MODES),
+            vol.Optional(CONF_DISPLAY): cv.boolean,
+            vol.Optional(CONF_TIMEOUT, default=DEFAULT_BULK_TIMEOUT): vol.All(
+                vol.Coerce(float), vol.Range(min=0, min_included=False)
+            ),
+        }
+    ),
+    cv.has_at_least_one_key(
+        ATTR_HVAC_MODE, ATTR_TEMPERATURE, ATTR_FAN_MODE, ATTR_SWING_MODE, CONF_DISPLAY
+    ),
+)
+
+
+def _changes(data) -> dict:
+    """Return the DeviceState fields to change for the service data."""
+    changes = {}
+    if (hvac_mode := data.get(ATTR_HVAC_MODE)) == HVACMode.OFF:
+        changes["power"] = False
+    elif hvac_mode is not None:
+        changes["power"] = True
+        changes["mode"] = HA_STATE_TO_MODE_MAP[hvac_mode]
+    if (temperature := data.get(ATTR_TEMPERATURE)) is not None:
+        changes["desiredTemperature"] = temperature
+    if (fan_mode := data.get(ATTR_FAN_MODE)) is not None:
+        changes["fanMode"] = FanMode(SUPPORT_FAN.index(fan_mode))
+    if (swing_mode := data.get(ATTR_SWING_MODE)) is not None:
+        horizontal, vertical = SWING_MODES[swing_mode]
+        changes["flowHorizontalMode"] = horizontal
+        changes["flowVerticalMode"] = vertical
+    if (display := data.get(CONF_DISPLAY)) is not None:
+        changes["display"] = display
+    return changes
+
+
+def _targets(hass: HomeAssistant, call: ServiceCall) -> dict:
+    """Return the coordinators of the targeted units keyed by entry id.
+
+    Every loaded unit is targeted by entity_id: all.
+    """
+    coordinators = hass.data.get(DOMAIN, {})
+    if call.data.get(ATTR_ENTITY_ID) == ENTITY_MATCH_ALL:
+        return dict(coordinators)
+    referenced = async_extract_referenced_entity_ids(hass, call)
+    entity_ids = referenced.referenced | referenced.indirectly_referenced
+    registry = er.async_get(hass)
+    targets = {}
+    for entity_id in entity_ids:
+        entry = registry.async_get(entity_id)
+        if entry is not None and entry.config_entry_id in coordinators:
+            targets[entry.config_entry_id] = coordinators[entry.config_entry_id]
+    return targets
+
+
+async def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the integration services."""
+
+    async def _async_scan(call: ServiceCall):
+        """Sweep subnets and offer every new unit for setup."""
+        port = call.data[CONF_PORT]
+        networks = call.data.get(CONF_SUBNETS) or await async_default_networks(hass)
+        configured = {
+            entry.data.get(CONF_IP)
+            for entry in hass.config_entries.async_entries(DOMAIN)
+            if entry.data.get(CONF_PORT, DEFAULT_PORT) == port
+        }
+        found = await async_scan(networks, port, exclude=configured)
+        for ip in found:
+            discovery_flow.async_create_flow(
+                hass,
+                DOMAIN,
+                context={"source": SOURCE_INTEGRATION_DISCOVERY},
+                data={CONF_IP: ip, CONF_PORT: port},
+            )
+        return {"found": found}
+
+    async def _async_bulk_set(call: ServiceCall):
+        """Send the same change to many units at once."""
+        changes = _changes(call.data)
+        timeout = call.data[CONF_TIMEOUT]
+        semaphore = asyncio.Semaphore(BULK_CONCURRENCY)
+
+        async def _set(coordinator) -> dict:
+            async with semaphore:
+                try:
+                    async with asyncio.timeout(timeout):
+                        await coordinator.send(**changes)
+                except TimeoutError:
+                    return {"success": False, "error": "timeout"}
+                except Exception as err:  # pylint: disable=broad-except
+                    return {"success": False, "error": str(err) or type(err).__name__}
+            return {"success": True}
+
+        targets = _targets(hass, call)
+        results = await asyncio.gather(
+            *(_set(coordinator) for coordinator in targets.values())
+        )
+        units = {
+            entry_id: {
+                CONF_IP: hass.config_entries.async_get_entry(entry_id).data[CONF_IP]
+            }
+            | result
+            for entry_id, result in zip(targets, results)
+        }
+        failed = [unit[CONF_IP] for unit in units.values() if not unit["success"]]
+        if failed and not call.return_response:
+            raise HomeAssistantError(f"Failed to update {', '.join(failed)}")
+        return {"units": units, "failed": len(failed)}
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_BULK_SET,
+        _async_bulk_set,
+        schema=BULK_SET_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SCAN,
+        _async_scan,
+        schema=SCAN_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
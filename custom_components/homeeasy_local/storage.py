@@ -0,0 +1,91 @@
+"""Last known state storage for Home Easy HVAC Local."""
+import asyncio
+import logging
+
+from homeeasy.DeviceState import DeviceState
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .codec import FRAME_SIZE, State
+from .const import DOMAIN, STORAGE_KEY, STORAGE_VERSION
+
+# Units push often, the file is written once per delay after the first
+# change, however many follow.
+SAVE_DELAY = 30
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+
+class StateStore:
+    """Persist the last DeviceState of every entry."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize."""
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._hass = hass
+        self._data: dict[str, str] = None
+        self._load_task: asyncio.Task = None
+        self._save_pending = False
+
+    async def async_load(self) -> None:
+        """Load the stored states once, however many entries ask for them."""
+        if self._load_task is None:
+            self._load_task = self._hass.async_create_task(self._async_load())
+        await self._load_task
+
+    async def _async_load(self) -> None:
+        self._data = await self._store.async_load() or {}
+
+    @callback
+    def async_get(self, entry_id: str) -> DeviceState | None:
+        """Return the last known state of an entry."""
+        if not self._data or (raw := self._data.get(entry_id)) is None:
+            return None
+        try:
+            frame = bytes.fromhex(raw)
+        except ValueError:
+            frame = b""
+        if len(frame) != FRAME_SIZE:
+            _LOGGER.warning("Ignoring corrupt stored state of %s", entry_id)
+            return None
+        return State(frame)
+
+    @callback
+    def async_set(self, entry_id: str, state: DeviceState) -> None:
+        """Remember the state of an entry."""
+        if self._data is None:
+            return
+        self._data[entry_id] = state.raw.hex()
+        self._async_schedule_save()
+
+    @callback
+    def async_remove(self, entry_id: str) -> None:
+        """Forget an entry."""
+        if self._data is not None and self._data.pop(entry_id, None) is not None:
+            self._async_schedule_save()
+
+    @callback
+    def _async_schedule_save(self) -> None:
+        """Write the file SAVE_DELAY after the first unsaved change.
+
+        Delaying the save again on every change would never write it while
+        any unit keeps pushing.
+        """
+        if not self._save_pending:
+            self._save_pending = True
+            self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self) -> dict[str, str]:
+        self._save_pending = False
+        return self._data
+
+
+@callback
+def async_get_store(hass: HomeAssistant) -> StateStore:
+    """Return the state store, creating it on first use."""
+    key = f"{DOMAIN}_store"
+    if (store := hass.data.get(key)) is None:
+        store = hass.data[key] = StateStore(hass)
+    return store
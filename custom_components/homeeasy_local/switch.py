@@ -1,7 +1,6 @@
 """Climate platform for Home Easy HVAC Local."""
-from homeeasy.DeviceState import DeviceState
-
 from homeassistant.components.switch import SwitchEntity
+from homeassistant.core import callback
 #from homeassistant.const import Platform
 from .const import DOMAIN, SWITCH
 from .entity import Entity
@@ -14,33 +13,31 @@ async def async_setup_entry(hass, entry, async_add_devices):
 
 
 class HomeEasyHvacLocalDisplay(Entity, SwitchEntity):
+    fields = frozenset({"display"})
+
     @property
     def name(self) -> str:
         """Return the name of the thermostat, if any."""
         return f"{super().name}_{SWITCH}_Display"
 
-    @property
-    def is_on(self) -> bool | None:
-        """Return true if the switch is on."""
-        state = self.coordinator.state
-        return state.display 
+    @callback
+    def _async_update_attrs(self) -> None:
+        """Cache whether the display is on from the shown state."""
+        state = self.coordinator.shown_state
+        self._attr_is_on = None if state is None else state.display
 
     async def async_turn_on(self, **kwargs):
         """Turn the entity on."""
-        state = self.coordinator.state
-        state.display = True
-        await self.coordinator.send(state)
+        await self.coordinator.send(display=True)
 
     async def async_turn_off(self, **kwargs):
         """Turn the entity off."""
-        state = self.coordinator.state
-        state.display = False
-        await self.coordinator.send(state)
+        await self.coordinator.send(display=False)
 
     @property
     def available(self) -> bool:
         """Return True if entity is available."""
-        state = self.coordinator.state
+        state = self.coordinator.shown_state
         return (
             super().available
             and hasattr(state, 'display')
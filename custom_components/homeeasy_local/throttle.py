@@ -0,0 +1,26 @@
+"""Command rate limiting for Home Easy HVAC Local."""
+
+
+class TokenBucket:
+    """Allow a burst of frames, then a steady rate of them."""
+
+    def __init__(self, rate: float, burst: int, now: float) -> None:
+        """Initialize with a full bucket."""
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = now
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self, now: float) -> float:
+        """Return the seconds until a frame may go out."""
+        self._refill(now)
+        return 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+
+    def take(self, now: float) -> None:
+        """Account for a frame going out, urgent ones may overdraw."""
+        self._refill(now)
+        self._tokens -= 1
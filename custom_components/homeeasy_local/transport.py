@@ -0,0 +1,165 @@
+"""Native asyncio transport of the Home Easy local protocol."""
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import Awaitable, Callable
+from contextlib import suppress
+import logging
+
+from .codec import FRAME_SIZE, HEADER, STATUS_REQUEST, State
+from .const import DEFAULT_PORT
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+
+class FrameProtocol(asyncio.Protocol):
+    """Cut the byte stream from a unit into state frames.
+
+    Frames are decoded straight from the received bytes, only a partial frame
+    is kept for the next chunk. Bytes before a header are skipped.
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        frame_callback: Callable[[State], None],
+        lost_callback: Callable[[FrameProtocol], None],
+    ) -> None:
+        """Initialize."""
+        self.transport: asyncio.Transport = None
+        self.closed = loop.create_future()
+        self._frame_callback = frame_callback
+        self._lost_callback = lost_callback
+        self._buffer = bytearray()
+
+    def connection_made(self, transport: asyncio.Transport) -> None:
+        """Keep the transport."""
+        self.transport = transport
+
+    def data_received(self, data: bytes) -> None:
+        """Decode every complete frame, keeping the rest."""
+        if self._buffer:
+            self._buffer += data
+            data = self._buffer
+        with memoryview(data) as view:
+            consumed = self._decode(view)
+        if data is self._buffer:
+            del self._buffer[:consumed]
+        elif consumed < len(data):
+            self._buffer += data[consumed:]
+
+    def _decode(self, view: memoryview) -> int:
+        """Hand out the frames in view, return the number of bytes used."""
+        start = 0
+        end = len(view)
+        while end - start >= FRAME_SIZE:
+            if view[start : start + len(HEADER)] != HEADER:
+                start += 1
+                continue
+            with view[start : start + FRAME_SIZE] as frame:
+                state = State(frame)
+            start += FRAME_SIZE
+            self._frame_callback(state)
+        if start == 0 and end >= len(HEADER):
+            # Keep a possible header, drop garbage that can never start one.
+            while start < end - len(HEADER) + 1 and view[start] != HEADER[0]:
+                start += 1
+        return start
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        """Report the link going down."""
+        if not self.closed.done():
+            self.closed.set_result(None)
+        self._lost_callback(self)
+
+
+class LocalClient:
+    """Link to a unit over a FrameProtocol.
+
+    Offers the methods of the library's HomeEasyLibLocal the connection
+    manager uses, but reports a lost link instead of reconnecting and hands
+    frames to the callback in order from a task running only while some
+    are waiting.
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        callback: Callable[[State], Awaitable[None]],
+        lost_callback: Callable[[], None],
+    ) -> None:
+        """Initialize."""
+        self._loop = loop
+        self._callback = callback
+        self._lost_callback = lost_callback
+        self._protocol: FrameProtocol = None
+        self._frames: deque[State] = deque()
+        self._dispatcher: asyncio.Task = None
+        # Commands are encoded in place, the transport copies what it cannot
+        # send right away.
+        self._command = bytearray(FRAME_SIZE)
+
+    @property
+    def connected(self) -> bool:
+        """Return True while the transport is open."""
+        return self._protocol is not None
+
+    async def connect(self, host: str, port: int = DEFAULT_PORT) -> None:
+        """Open the link, replacing the previous one."""
+        await self.disconnect()
+        _, self._protocol = await self._loop.create_connection(
+            lambda: FrameProtocol(self._loop, self._on_frame, self._on_lost),
+            host,
+            port,
+        )
+
+    async def disconnect(self) -> None:
+        """Close the link and drop the frames not handed out yet."""
+        protocol, self._protocol = self._protocol, None
+        self._frames.clear()
+        dispatcher, self._dispatcher = self._dispatcher, None
+        if dispatcher is not None and dispatcher is not asyncio.current_task():
+            dispatcher.cancel()
+            with suppress(asyncio.CancelledError):
+                await dispatcher
+        if protocol is not None:
+            protocol.transport.close()
+            await protocol.closed
+
+    async def request_status_async(self) -> None:
+        """Ask the unit for its state."""
+        self._write(STATUS_REQUEST)
+
+    async def send(self, state) -> None:
+        """Send a state to the unit."""
+        if isinstance(state, State):
+            state.encode_command(self._command)
+            self._write(self._command)
+        else:
+            self._write(state.cmd)
+
+    def _write(self, data) -> None:
+        if self._protocol is None or self._protocol.transport.is_closing():
+            raise ConnectionError("Not connected")
+        self._protocol.transport.write(data)
+
+    def _on_frame(self, state: State) -> None:
+        self._frames.append(state)
+        if self._dispatcher is None:
+            self._dispatcher = self._loop.create_task(self._async_dispatch())
+
+    async def _async_dispatch(self) -> None:
+        try:
+            while self._frames:
+                await self._callback(self._frames.popleft())
+        finally:
+            if self._dispatcher is asyncio.current_task():
+                self._dispatcher = None
+
+    def _on_lost(self, protocol: FrameProtocol) -> None:
+        if protocol is not self._protocol:
+            # Closed by disconnect, nothing to report.
+            return
+        self._protocol = None
+        self._lost_callback()
@@ -1 +1 @@
-"""Tests for integration_blueprint integration."""
+"""Tests for Home Easy HVAC Local integration."""
@@ -0,0 +1,58 @@
+"""Helpers to collect and report benchmark measurements."""
+
+from dataclasses import dataclass, field
+import statistics
+
+
+@dataclass
+class Metric:
+    """A named series of samples."""
+
+    name: str
+    unit: str
+    samples: list[float] = field(default_factory=list)
+
+    def add(self, value: float) -> None:
+        """Add a sample."""
+        self.samples.append(value)
+
+    def percentile(self, pct: int) -> float:
+        """Return the given percentile of the samples."""
+        if len(self.samples) < 2:
+            return self.samples[0] if self.samples else 0.0
+        return statistics.quantiles(self.samples, n=100, method="inclusive")[pct - 1]
+
+    def line(self) -> str:
+        """Return a one line summary."""
+        if not self.samples:
+            return f"{self.name:<40} no samples"
+        return (
+            f"{self.name:<40} n={len(self.samples):<5} "
+            f"mean={statistics.fmean(self.samples):9.3f}{self.unit} "
+            f"p50={self.percentile(50):9.3f}{self.unit} "
+            f"p95={self.percentile(95):9.3f}{self.unit} "
+            f"max={max(self.samples):9.3f}{self.unit}"
+        )
+
+
+class Report:
+    """Benchmark results of the whole test session."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+
+    def metric(self, name: str, unit: str = "ms") -> Metric:
+        """Return the metric with the given name, creating it on first use."""
+        if name not in self._metrics:
+            self._metrics[name] = Metric(name, unit)
+        return self._metrics[name]
+
+    def lines(self) -> list[str]:
+        """Return the summary of every metric."""
+        return [metric.line() for metric in self._metrics.values()]
+
+    def __bool__(self) -> bool:
+        return bool(self._metrics)
+
+
+REPORT = Report()
@@ -1,4 +1,5 @@
-"""Global fixtures for integration_blueprint integration."""
+"""Global fixtures for Home Easy HVAC Local integration."""
+
 # Fixtures allow you to replace functions with a Mock object. You can perform
 # many options via the Mock to reflect a particular behavior from the original
 # function that you want to see without going through the function's actual logic.
@@ -14,10 +15,17 @@
 #
 # See here for more info: https://docs.pytest.org/en/latest/fixture.html (note that
 # pytest includes fixtures OOB which you can use as defined on this page)
+import asyncio
 from unittest.mock import patch
 
 import pytest
 
+from custom_components.homeeasy_local.const import CONF_IP, CONF_PORT, DOMAIN
+from custom_components.homeeasy_local.hub import async_get_hub
+
+from .benchmark import REPORT
+from .simulator import SimulatedUnit
+
 pytest_plugins = "pytest_homeassistant_custom_component"
 
 
@@ -40,24 +48,58 @@ def skip_notifications_fixture():
         yield
 
 
-# This fixture, when used, will result in calls to async_get_data to return None. To have the call
-# return a value, we would add the `return_value=<VALUE_TO_RETURN>` parameter to the patch call.
-@pytest.fixture(name="bypass_get_data")
-def bypass_get_data_fixture():
-    """Skip calls to get data from API."""
-    with patch(
-        "custom_components.integration_blueprint.IntegrationBlueprintApiClient.async_get_data"
-    ):
-        yield
+# A simulated HVAC unit listening on a random local port. Tests talk to it through
+# the real `LocalClient` transport instead of mocking the protocol. Home Assistant
+# blocks sockets in tests, so the unit re-enables them for its own lifetime.
+@pytest.fixture(name="unit")
+async def unit_fixture(hass, socket_enabled):
+    """Start a simulated unit."""
+    unit = SimulatedUnit()
+    await unit.start()
+    yield unit
+    await disconnect_coordinators(hass)
+    await unit.stop()
+
+
+async def disconnect_coordinators(hass):
+    """Disconnect coordinators left behind by a test.
 
+    Coordinators keep a socket and a receive task open, Home Assistant would
+    report them as lingering tasks.
+    """
+    for coordinator in list(hass.data.get(DOMAIN, {}).values()):
+        await coordinator.async_close()
+    await async_get_hub(hass).async_close()
 
-# In this fixture, we are forcing calls to async_get_data to raise an Exception. This is useful
+
+@pytest.fixture(name="mock_config")
+def mock_config_fixture(unit):
+    """Return config entry data pointing at the simulated unit."""
+    return {CONF_IP: unit.host, CONF_PORT: unit.port}
+
+
+async def wait_for(predicate, timeout=5):
+    """Wait until predicate holds, frames travel over real sockets."""
+    async with asyncio.timeout(timeout):
+        while not predicate():
+            await asyncio.sleep(0.01)
+
+
+# In this fixture, we are forcing the connection to raise an Exception. This is useful
 # for exception handling.
 @pytest.fixture(name="error_on_get_data")
 def error_get_data_fixture():
-    """Simulate error when retrieving data from API."""
+    """Simulate error when connecting to the unit."""
     with patch(
-        "custom_components.integration_blueprint.IntegrationBlueprintApiClient.async_get_data",
-        side_effect=Exception,
+        "custom_components.homeeasy_local.transport.LocalClient.connect",
+        side_effect=OSError,
     ):
         yield
+
+
+def pytest_terminal_summary(terminalreporter):
+    """Print benchmark results collected during the run."""
+    if REPORT:
+        terminalreporter.section("homeeasy_local benchmark")
+        for line in REPORT.lines():
+            terminalreporter.write_line(line)
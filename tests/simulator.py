@@ -0,0 +1,312 @@
+"""Simulated Home Easy HVAC units speaking the local protocol.
+
+A unit listens on TCP, answers the 21 byte status request with its current
+state frame, applies command frames and pushes the resulting state to every
+connected client, exactly like the real hardware does for `HomeEasyLibLocal`.
+
+The state is kept as raw bytes so that a single process can host hundreds of
+units without the simulator itself dominating CPU measurements.
+
+Run a standalone fleet with:
+
+    python -m tests.simulator --count 200 --host 127.0.0.1 --port 20000
+
+On Linux every 127.0.0.0/8 address is local, so `--spread` binds unit N to
+127.0.1.N on the default port and real config entries can point at them.
+"""
+
+import argparse
+import asyncio
+from ipaddress import IPv4Address
+import logging
+import random
+
+from homeeasy.DeviceState import (
+    DeviceState,
+    FanMode,
+    HorizontalFlowMode,
+    Mode,
+    VerticalFlowMode,
+)
+
+DEFAULT_PORT = 12416
+FRAME_SIZE = 21
+STATUS_REQUEST = bytes(
+    [170, 170, 18, 160, 10, 10, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 26]
+)
+HEADER = bytes([170, 170, 18])
+COMMAND = 0x01
+STATUS = 0xA0
+REPORT = 0x02
+INDOOR_TEMPERATURE = slice(15, 17)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def checksum(frame) -> int:
+    """Return the protocol checksum of a frame."""
+    return sum(frame[:-1]) & 0xFF
+
+
+def initial_frame() -> bytearray:
+    """Return the state frame of a freshly powered unit."""
+    state = DeviceState(HEADER + bytes(FRAME_SIZE - len(HEADER)))
+    state.power = True
+    state.mode = Mode.Cool
+    state.fanMode = FanMode.Auto
+    state.desiredTemperature = 24
+    state.display = True
+    frame = bytearray(state.raw)
+    frame[INDOOR_TEMPERATURE] = bytes([23, 5])
+    return frame
+
+
+def record_frames(count: int, seed: int = 0) -> list[bytes]:
+    """Return the frames a unit pushes while its remote control is played with."""
+    rng = random.Random(seed)
+    unit = SimulatedUnit()
+    frames = []
+    for _ in range(count):
+        unit.update(
+            power=rng.random() < 0.9,
+            mode=rng.choice(list(Mode)),
+            fanMode=rng.choice(list(FanMode)),
+            desiredTemperature=rng.randint(16, 30),
+            display=rng.random() < 0.5,
+            flowHorizontalMode=rng.choice(list(HorizontalFlowMode)),
+            flowVerticalMode=rng.choice(list(VerticalFlowMode)),
+        )
+        unit.set_indoor_temperature(round(rng.uniform(10, 35), 1))
+        frame = unit.frame
+        frame[3] = REPORT
+        frame[-1] = checksum(frame)
+        frames.append(bytes(frame))
+    return frames
+
+
+class SimulatedUnit:
+    """One simulated HVAC unit."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        *,
+        response_delay: float = 0.0,
+        status_delay: float = 0.0,
+        push_interval: float | None = None,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.response_delay = response_delay
+        # Extra delay of status replies only, the unit keeps reading meanwhile.
+        self.status_delay = status_delay
+        self.push_interval = push_interval
+        self.frame = initial_frame()
+        self.status_requests = 0
+        self.commands = 0
+        self.frames_sent = 0
+        self.connections = 0
+        self.silent = False
+        # Commands to answer without applying them, like a busy unit.
+        self.ignore_commands = 0
+        self._server: asyncio.AbstractServer | None = None
+        self._writers: set[asyncio.StreamWriter] = set()
+        self._handlers: set[asyncio.Task] = set()
+        self._pusher: asyncio.Task | None = None
+
+    @property
+    def state(self) -> DeviceState:
+        """Return the decoded current state."""
+        return DeviceState(bytes(self.frame))
+
+    @property
+    def clients(self) -> int:
+        """Return the number of connected clients."""
+        return len(self._writers)
+
+    async def start(self) -> None:
+        """Start listening."""
+        self._server = await asyncio.start_server(
+            self._handle_client, self.host, self.port
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        if self.push_interval:
+            self._pusher = asyncio.create_task(self._push_loop())
+
+    async def stop(self) -> None:
+        """Stop listening and drop every client."""
+        if self._pusher is not None:
+            self._pusher.cancel()
+            self._pusher = None
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        self.drop_connections()
+        if self._handlers:
+            await asyncio.wait(self._handlers)
+
+    def drop_connections(self) -> None:
+        """Close every client connection, like a unit leaving Wi-Fi."""
+        for writer in list(self._writers):
+            writer.close()
+
+    def update(self, **fields) -> None:
+        """Change the state as if done with the remote control."""
+        state = self.state
+        for key, value in fields.items():
+            setattr(state, key, value)
+        indoor = self.frame[INDOOR_TEMPERATURE]
+        self.frame = bytearray(state.raw)
+        self.frame[INDOOR_TEMPERATURE] = indoor
+
+    def set_indoor_temperature(self, value: float) -> None:
+        """Change the measured temperature."""
+        whole = int(value)
+        self.frame[INDOOR_TEMPERATURE] = bytes([whole, round((value - whole) * 10)])
+
+    async def push(self) -> None:
+        """Send the current state to every client unsolicited."""
+        for writer in list(self._writers):
+            self._write(writer)
+
+    def _write(self, writer: asyncio.StreamWriter) -> None:
+        frame = self.frame
+        frame[3] = REPORT
+        frame[-1] = checksum(frame)
+        try:
+            writer.write(bytes(frame))
+        except (ConnectionError, RuntimeError):
+            return
+        self.frames_sent += 1
+
+    async def _push_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.push_interval * random.uniform(0.5, 1.5))
+            indoor = self.frame[INDOOR_TEMPERATURE]
+            self.set_indoor_temperature(
+                max(
+                    10.0,
+                    min(35.0, indoor[0] + indoor[1] / 10 + random.uniform(-0.3, 0.3)),
+                )
+            )
+            await self.push()
+
+    async def _handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self._handlers.add(asyncio.current_task())
+        self._writers.add(writer)
+        self.connections += 1
+        try:
+            while True:
+                frame = await reader.readexactly(FRAME_SIZE)
+                await self._handle_frame(writer, frame)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+            self._handlers.discard(asyncio.current_task())
+
+    async def _handle_frame(self, writer: asyncio.StreamWriter, frame: bytes) -> None:
+        if frame[:3] != HEADER or frame[-1] != checksum(frame):
+            _LOGGER.debug("Dropping malformed frame %s", frame.hex())
+            return
+        if self.response_delay:
+            await asyncio.sleep(self.response_delay)
+        if self.silent:
+            return
+        if frame[3] == STATUS:
+            self.status_requests += 1
+            if self.status_delay:
+                asyncio.get_running_loop().call_later(
+                    self.status_delay, self._write, writer
+                )
+            else:
+                self._write(writer)
+        elif frame[3] == COMMAND:
+            self.commands += 1
+            if self.ignore_commands:
+                self.ignore_commands -= 1
+                await self.push()
+                return
+            indoor = self.frame[INDOOR_TEMPERATURE]
+            self.frame[4:-1] = frame[4:-1]
+            self.frame[INDOOR_TEMPERATURE] = indoor
+            await self.push()
+
+
+class SimulatedFleet:
+    """A group of simulated units sharing one event loop."""
+
+    def __init__(
+        self,
+        count: int,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        *,
+        spread: bool = False,
+        **kwargs,
+    ) -> None:
+        if spread:
+            first = IPv4Address("127.0.1.1")
+            self.units = [
+                SimulatedUnit(str(first + index), port or DEFAULT_PORT, **kwargs)
+                for index in range(count)
+            ]
+        else:
+            self.units = [
+                SimulatedUnit(host, port + index if port else 0, **kwargs)
+                for index in range(count)
+            ]
+
+    async def start(self) -> None:
+        """Start every unit."""
+        await asyncio.gather(*(unit.start() for unit in self.units))
+
+    async def stop(self) -> None:
+        """Stop every unit."""
+        await asyncio.gather(*(unit.stop() for unit in self.units))
+
+    async def __aenter__(self) -> "SimulatedFleet":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
+
+    def __iter__(self):
+        return iter(self.units)
+
+    def __len__(self) -> int:
+        return len(self.units)
+
+
+async def _main(args: argparse.Namespace) -> None:
+    fleet = SimulatedFleet(
+        args.count,
+        args.host,
+        args.port,
+        spread=args.spread,
+        response_delay=args.delay,
+        push_interval=args.push_interval,
+    )
+    async with fleet:
+        for unit in fleet:
+            print(f"{unit.host}:{unit.port}")
+        await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=1)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--spread", action="store_true")
+    parser.add_argument("--delay", type=float, default=0.0)
+    parser.add_argument("--push-interval", type=float, default=None)
+    try:
+        asyncio.run(_main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
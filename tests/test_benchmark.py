@@ -0,0 +1,378 @@
+"""Load benchmark of the integration against a fleet of simulated units.
+
+The fleet size and the latency budgets can be tuned through environment
+variables, for example:
+
+    HOMEEASY_BENCH_UNITS=200 pytest tests/test_benchmark.py
+"""
+
+import asyncio
+import json
+import os
+from pathlib import Path
+import subprocess
+import sys
+import time
+from unittest.mock import patch
+
+from homeassistant.components.climate import (
+    ATTR_TEMPERATURE,
+    SERVICE_SET_TEMPERATURE,
+)
+from homeassistant.components.select import ATTR_OPTION, SERVICE_SELECT_OPTION
+from homeassistant.components.switch import SERVICE_TURN_OFF, SERVICE_TURN_ON
+from homeassistant.const import ATTR_ENTITY_ID
+from homeeasy.DeviceState import DeviceState, HorizontalFlowMode, VerticalFlowMode
+from homeassistant.helpers import entity_registry as er
+from homeassistant.setup import async_setup_component
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.homeeasy_local.capture import FRAME, append_records, async_replay
+from custom_components.homeeasy_local.codec import FRAME_SIZE, State
+from custom_components.homeeasy_local.const import (
+    CLIMATE,
+    CONF_IP,
+    CONF_PORT,
+    DOMAIN,
+    SELECT,
+    SWITCH,
+)
+
+from .benchmark import REPORT
+from .conftest import disconnect_coordinators, wait_for
+from .simulator import INDOOR_TEMPERATURE, SimulatedFleet, record_frames
+
+UNITS = int(os.environ.get("HOMEEASY_BENCH_UNITS", "20"))
+ROUNDS = int(os.environ.get("HOMEEASY_BENCH_ROUNDS", "5"))
+STATUS_BUDGET_MS = float(os.environ.get("HOMEEASY_BENCH_STATUS_P95_MS", "500"))
+COMMAND_BUDGET_MS = float(os.environ.get("HOMEEASY_BENCH_COMMAND_P95_MS", "1000"))
+# Commands per second each unit accepts, the benchmark measures the link by
+# default rather than the rate limiter.
+COMMAND_RATE = float(os.environ.get("HOMEEASY_BENCH_COMMAND_RATE", "1000"))
+UPDATE_UNITS = int(os.environ.get("HOMEEASY_BENCH_UPDATE_UNITS", "100"))
+UPDATE_BUDGET_MS = float(os.environ.get("HOMEEASY_BENCH_UPDATE_P95_MS", "5"))
+CODEC_FRAMES = int(os.environ.get("HOMEEASY_BENCH_CODEC_FRAMES", "2000"))
+REPLAY_FRAMES = int(os.environ.get("HOMEEASY_BENCH_REPLAY_FRAMES", "20"))
+# Fleet benchmarks set up a hundred units, more than CI's per test timeout allows.
+FLEET_TIMEOUT = 60
+IMPORT_RUNS = int(os.environ.get("HOMEEASY_BENCH_IMPORT_RUNS", "3"))
+IMPORT_BUDGET_MS = float(os.environ.get("HOMEEASY_BENCH_IMPORT_MS", "300"))
+FIRST_STATE_BUDGET_MS = float(os.environ.get("HOMEEASY_BENCH_FIRST_STATE_MS", "1000"))
+# Modules of the cloud client, the local integration must not load them.
+CLOUD_MODULES = ("homeeasy.HomeEasyLib", "paho", "Crypto")
+# Home Assistant core is loaded before the integration in a real instance, so
+# only the time spent on top of it is measured: importing the integration and
+# setting it up without any entry.
+LOAD_SCRIPT = """
+import asyncio, json, sys, tempfile, time
+import homeassistant.config_entries, homeassistant.helpers.update_coordinator
+from homeassistant.core import HomeAssistant
+
+async def main():
+    hass = HomeAssistant(tempfile.mkdtemp())
+    start = time.perf_counter()
+    import custom_components.homeeasy_local as integration
+    await integration.async_setup(hass, {})
+    ms = (time.perf_counter() - start) * 1000
+    print(json.dumps({"ms": ms, "modules": list(sys.modules)}))
+
+asyncio.run(main())
+"""
+
+
+@pytest.fixture(name="fleet")
+async def fleet_fixture(hass, socket_enabled, request):
+    """Start a fleet of simulated units."""
+    fleet = SimulatedFleet(getattr(request, "param", UNITS))
+    await fleet.start()
+    with patch(
+        "custom_components.homeeasy_local.coordinator.COMMAND_RATE", COMMAND_RATE
+    ):
+        yield fleet
+    await disconnect_coordinators(hass)
+    await fleet.stop()
+
+
+async def _setup_fleet(hass, fleet):
+    """Add an entry per unit, set them up and return their coordinators."""
+    entries = []
+    for unit in fleet:
+        entry = MockConfigEntry(
+            domain=DOMAIN,
+            title=f"{unit.host}:{unit.port}",
+            data={CONF_IP: unit.host, CONF_PORT: unit.port},
+        )
+        entry.add_to_hass(hass)
+        entries.append(entry)
+    assert await async_setup_component(hass, DOMAIN, {})
+    await hass.async_block_till_done()
+    return entries
+
+
+async def _wait_for_update(coordinator, predicate, timeout=5):
+    """Wait until the coordinator publishes a state matching predicate."""
+    updated = asyncio.Event()
+
+    def _listener():
+        if coordinator.state is not None and predicate(coordinator.state):
+            updated.set()
+
+    remove = coordinator.async_add_listener(_listener)
+    try:
+        async with asyncio.timeout(timeout):
+            await updated.wait()
+    finally:
+        remove()
+
+
+async def test_fleet_benchmark(hass, fleet):
+    """Measure setup, status round-trip and command confirmation latencies."""
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    entries = await _setup_fleet(hass, fleet)
+    setup = time.perf_counter() - start
+    REPORT.metric("setup per device").add(setup * 1000 / len(fleet))
+
+    coordinators = [hass.data[DOMAIN][entry.entry_id] for entry in entries]
+    await wait_for(
+        lambda: all(coordinator.state is not None for coordinator in coordinators)
+    )
+    REPORT.metric("time to first state per device").add(
+        (time.perf_counter() - start) * 1000 / len(fleet)
+    )
+
+    status = REPORT.metric("status round-trip")
+
+    async def _status(coordinator):
+        start = time.perf_counter()
+        waiter = asyncio.create_task(_wait_for_update(coordinator, lambda _: True))
+        await asyncio.sleep(0)
+        await coordinator.connection.async_request_status()
+        await waiter
+        status.add((time.perf_counter() - start) * 1000)
+
+    for _ in range(ROUNDS):
+        await asyncio.gather(*(_status(coordinator) for coordinator in coordinators))
+
+    registry = er.async_get(hass)
+    command = REPORT.metric("command-to-confirmation")
+
+    async def _command(entry, coordinator, attempt):
+        if attempt % 3 == 0:
+            platform = CLIMATE
+            service = SERVICE_SET_TEMPERATURE
+            target = 18 + attempt % 10
+            data = {ATTR_TEMPERATURE: target}
+            predicate = lambda state: state.desiredTemperature == target
+        elif attempt % 3 == 1:
+            platform = SELECT
+            service = SERVICE_SELECT_OPTION
+            option = "Swing" if coordinator.state.flowVerticalMode == 0 else "Stop"
+            data = {ATTR_OPTION: option}
+            predicate = lambda state: int(state.flowVerticalMode) == (
+                1 if option == "Swing" else 0
+            )
+        else:
+            platform = SWITCH
+            display = not coordinator.state.display
+            service = SERVICE_TURN_ON if display else SERVICE_TURN_OFF
+            data = {}
+            predicate = lambda state: state.display == display
+        entity_id = registry.async_get_entity_id(platform, DOMAIN, entry.entry_id)
+        start = time.perf_counter()
+        waiter = asyncio.create_task(_wait_for_update(coordinator, predicate))
+        await asyncio.sleep(0)
+        await hass.services.async_call(
+            platform, service, {ATTR_ENTITY_ID: entity_id, **data}, blocking=True
+        )
+        await waiter
+        command.add((time.perf_counter() - start) * 1000)
+
+    for attempt in range(ROUNDS * 3):
+        await asyncio.gather(
+            *(
+                _command(entry, coordinator, attempt)
+                for entry, coordinator in zip(entries, coordinators)
+            )
+        )
+
+    cpu = time.process_time() - cpu_start
+    REPORT.metric("CPU per device (incl. simulator)").add(cpu * 1000 / len(fleet))
+
+    assert status.percentile(95) < STATUS_BUDGET_MS
+    assert command.percentile(95) < COMMAND_BUDGET_MS
+
+
+def _frame(state, indoor=None, **fields):
+    """Return a copy of the state with the fields set."""
+    raw = bytearray(state.raw)
+    if indoor is not None:
+        raw[INDOOR_TEMPERATURE] = bytes([indoor, 0])
+    state = State(raw)
+    for key, value in fields.items():
+        setattr(state, key, value)
+    return state
+
+
+@pytest.mark.timeout(FLEET_TIMEOUT)
+@pytest.mark.parametrize("fleet", [UPDATE_UNITS], indirect=True)
+async def test_entity_update_benchmark(hass, fleet):
+    """Measure the cost of publishing a frame to the entities of every unit."""
+    entries = await _setup_fleet(hass, fleet)
+    coordinators = [hass.data[DOMAIN][entry.entry_id] for entry in entries]
+    await wait_for(
+        lambda: all(coordinator.state is not None for coordinator in coordinators)
+    )
+
+    every_field = REPORT.metric(f"update every entity ({len(fleet)} units)")
+    indoor_only = REPORT.metric(f"update indoor temperature ({len(fleet)} units)")
+    for attempt in range(ROUNDS * 10):
+        for metric, fields in (
+            (
+                every_field,
+                {
+                    "desiredTemperature": 18 + attempt % 10,
+                    "display": bool(attempt % 2),
+                    "flowHorizontalMode": HorizontalFlowMode(attempt % 2),
+                    "flowVerticalMode": VerticalFlowMode(attempt % 2),
+                },
+            ),
+            (indoor_only, {"indoor": 20 + attempt % 5}),
+        ):
+            frames = [
+                _frame(coordinator.state, **fields) for coordinator in coordinators
+            ]
+            start = time.perf_counter()
+            for coordinator, frame in zip(coordinators, frames):
+                await coordinator._update_callback(frame)
+            metric.add((time.perf_counter() - start) * 1000 / len(fleet))
+
+    assert every_field.percentile(95) < UPDATE_BUDGET_MS
+
+
+@pytest.mark.timeout(FLEET_TIMEOUT)
+@pytest.mark.parametrize("fleet", [UPDATE_UNITS], indirect=True)
+async def test_replay_benchmark(hass, fleet, tmp_path):
+    """Measure entity updates replaying a capture into every unit at once."""
+    entries = await _setup_fleet(hass, fleet)
+    coordinators = [hass.data[DOMAIN][entry.entry_id] for entry in entries]
+    await wait_for(
+        lambda: all(coordinator.state is not None for coordinator in coordinators)
+    )
+    path = str(tmp_path / "fleet.capture")
+    append_records(
+        path,
+        [
+            (index * 0.5, FRAME, frame)
+            for index, frame in enumerate(record_frames(REPLAY_FRAMES))
+        ],
+    )
+
+    metric = REPORT.metric(f"replay per frame ({len(fleet)} units)")
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        counts = await asyncio.gather(
+            *(async_replay(coordinator, path, speed=0) for coordinator in coordinators)
+        )
+        metric.add((time.perf_counter() - start) * 1000 / sum(counts))
+
+    assert metric.percentile(95) < UPDATE_BUDGET_MS
+
+
+def _decode(cls, frames):
+    """Decode the frames and read every field the entities show."""
+    for frame in frames:
+        state = cls(frame)
+        (
+            state.power,
+            state.mode,
+            state.fanMode,
+            state.desiredTemperature,
+            state.indoorTemperature,
+            state.temperatureScale,
+            state.flowHorizontalMode,
+            state.flowVerticalMode,
+            state.display,
+        )
+
+
+def _encode(states, desired):
+    """Set a field on each state and build its command."""
+    buffer = bytearray(FRAME_SIZE)
+    for state in states:
+        state.desiredTemperature = desired
+        if isinstance(state, State):
+            state.encode_command(buffer)
+        else:
+            state.cmd
+
+
+def test_codec_benchmark():
+    """Measure the codec against the library on recorded frames."""
+    frames = record_frames(CODEC_FRAMES)
+    views = [memoryview(frame) for frame in frames]
+    timings = {}
+    for name, cls, source in (
+        ("library", DeviceState, frames),
+        ("native", State, views),
+    ):
+        decode = REPORT.metric(f"decode per frame ({name})", "us")
+        encode = REPORT.metric(f"encode per command ({name})", "us")
+        states = [cls(frame) for frame in frames]
+        for attempt in range(ROUNDS):
+            start = time.perf_counter()
+            _decode(cls, source)
+            decode.add((time.perf_counter() - start) * 1e6 / len(frames))
+            start = time.perf_counter()
+            _encode(states, 16 + attempt)
+            encode.add((time.perf_counter() - start) * 1e6 / len(frames))
+        timings[name] = (decode.percentile(50), encode.percentile(50))
+
+    assert timings["native"][0] < timings["library"][0]
+    assert timings["native"][1] < timings["library"][1]
+
+
+def test_import_benchmark():
+    """Measure the cold load of the integration and check what it imports."""
+    metric = REPORT.metric("cold import and setup of the integration")
+    for _ in range(IMPORT_RUNS):
+        result = subprocess.run(
+            [sys.executable, "-c", LOAD_SCRIPT],
+            cwd=Path(__file__).parents[1],
+            capture_output=True,
+            check=True,
+            text=True,
+        )
+        measured = json.loads(result.stdout.splitlines()[-1])
+        metric.add(measured["ms"])
+
+    loaded = [
+        module
+        for module in measured["modules"]
+        for cloud in CLOUD_MODULES
+        if module == cloud or module.startswith(f"{cloud}.")
+    ]
+    assert not loaded
+    # Platforms are only imported by Home Assistant once an entry is set up.
+    assert "custom_components.homeeasy_local.climate" not in measured["modules"]
+    assert min(metric.samples) < IMPORT_BUDGET_MS
+
+
+async def test_first_state_benchmark(hass, unit, mock_config):
+    """Measure the time from setting up an entry to its climate entity state."""
+    start = time.perf_counter()
+    entry = MockConfigEntry(domain=DOMAIN, data=mock_config, entry_id="test")
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    registry = er.async_get(hass)
+
+    def _ready():
+        entity_id = registry.async_get_entity_id(CLIMATE, DOMAIN, "test")
+        state = entity_id and hass.states.get(entity_id)
+        return state is not None and state.attributes.get(ATTR_TEMPERATURE)
+
+    await wait_for(_ready)
+    elapsed = (time.perf_counter() - start) * 1000
+    REPORT.metric("time to first entity state").add(elapsed)
+    assert elapsed < FIRST_STATE_BUDGET_MS
@@ -0,0 +1,105 @@
+"""Test Home Easy HVAC Local traffic capture and replay."""
+
+import time
+from unittest.mock import patch
+
+from homeassistant.components.climate import ATTR_TEMPERATURE
+from homeassistant.helpers import entity_registry as er
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.homeeasy_local.capture import (
+    FRAME,
+    STATE,
+    append_records,
+    async_replay,
+    read_records,
+)
+from custom_components.homeeasy_local.codec import State
+from custom_components.homeeasy_local.const import CLIMATE, CONF_CAPTURE, DOMAIN
+
+from .conftest import wait_for
+from .simulator import record_frames
+
+
+async def _setup(hass, mock_config, options=None):
+    entry = MockConfigEntry(
+        domain=DOMAIN, data=mock_config, options=options or {}, entry_id="test"
+    )
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    return entry, hass.data[DOMAIN][entry.entry_id]
+
+
+async def test_capture_records_traffic(hass, unit, mock_config, tmp_path):
+    """Test received frames and published states are appended to the file."""
+    path = str(tmp_path / "test.capture")
+    with patch(
+        "custom_components.homeeasy_local.coordinator.capture_path",
+        return_value=path,
+    ):
+        entry, coordinator = await _setup(hass, mock_config, {CONF_CAPTURE: True})
+    await wait_for(lambda: coordinator.state is not None)
+    for temperature in (20, 21, 22):
+        unit.update(desiredTemperature=temperature)
+        await unit.push()
+        await wait_for(lambda: coordinator.state.desiredTemperature == temperature)
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+    records = list(read_records(path))
+    frames = [State(frame) for _, kind, frame in records if kind == FRAME]
+    states = [State(frame) for _, kind, frame in records if kind == STATE]
+    assert [state.desiredTemperature for state in frames[-3:]] == [20, 21, 22]
+    assert states[-1].desiredTemperature == 22
+    stamps = [stamp for stamp, _, _ in records]
+    assert stamps == sorted(stamps)
+    assert abs(stamps[-1] - time.time()) < 60
+
+
+async def test_capture_follows_options(hass, unit, mock_config, tmp_path):
+    """Test capture starts and stops with the option, without a reload."""
+    path = tmp_path / "test.capture"
+    with patch(
+        "custom_components.homeeasy_local.coordinator.capture_path",
+        return_value=str(path),
+    ):
+        entry, coordinator = await _setup(hass, mock_config)
+        assert coordinator.capture is None
+
+        hass.config_entries.async_update_entry(entry, options={CONF_CAPTURE: True})
+        await hass.async_block_till_done()
+        assert coordinator.capture is not None
+        await unit.push()
+        await wait_for(lambda: coordinator.capture._records)
+
+        hass.config_entries.async_update_entry(entry, options={CONF_CAPTURE: False})
+        await hass.async_block_till_done()
+    assert coordinator.capture is None
+    assert any(kind == FRAME for _, kind, _ in read_records(str(path)))
+
+
+async def test_replay(hass, unit, mock_config, tmp_path):
+    """Test a capture replays through the coordinator to the entities."""
+    frames = record_frames(50)
+    path = str(tmp_path / "field.capture")
+    append_records(
+        path, [(1000 + index * 0.01, FRAME, f) for index, f in enumerate(frames)]
+    )
+    # A state record and a truncated record are skipped
+    append_records(path, [(2000, STATE, frames[0])])
+    with open(path, "ab") as file:
+        file.write(b"\x00" * 7)
+
+    _, coordinator = await _setup(hass, mock_config)
+    await wait_for(lambda: coordinator.state is not None)
+    entity_id = er.async_get(hass).async_get_entity_id(CLIMATE, DOMAIN, "test")
+
+    assert await async_replay(coordinator, path, speed=0) == len(frames)
+    assert coordinator.state.raw == frames[-1]
+    assert hass.states.get(entity_id).attributes[ATTR_TEMPERATURE] == (
+        State(frames[-1]).desiredTemperature
+    )
+
+    start = time.perf_counter()
+    assert await async_replay(coordinator, path, speed=5) == len(frames)
+    assert 0.09 < time.perf_counter() - start < 0.5
@@ -0,0 +1,68 @@
+"""Test Home Easy HVAC Local frame codec and transport."""
+
+import asyncio
+from unittest.mock import Mock
+
+from homeeasy.DeviceState import DeviceState, FanMode, HorizontalFlowMode, Mode
+
+from custom_components.homeeasy_local.codec import FRAME_SIZE, State
+from custom_components.homeeasy_local.coordinator import STATE_FIELDS
+from custom_components.homeeasy_local.transport import FrameProtocol
+
+from .simulator import record_frames
+
+FIELDS = (*STATE_FIELDS, "turbo", "quite", "fanSpeed")
+
+
+def test_state_matches_library():
+    """Test every field decodes and encodes like the library does."""
+    for frame in record_frames(200):
+        ours, theirs = State(memoryview(frame)), DeviceState(frame)
+        for field in FIELDS:
+            assert getattr(ours, field) == getattr(theirs, field), field
+        assert ours.raw == theirs.raw
+        assert ours.cmd == theirs.cmd
+        assert ours.bits == theirs.bits
+
+        for state in (ours, theirs):
+            state.mode = Mode.Heat
+            state.fanMode = FanMode.Turbo
+            state.desiredTemperature = 27
+            state.flowHorizontalMode = HorizontalFlowMode.Swing_Wide
+            state.display = "false"
+        assert ours.cmd == theirs.cmd
+
+
+def test_encode_command_in_place():
+    """Test commands are written into the buffer handed in."""
+    frame = record_frames(1)[0]
+    state = State(frame)
+    buffer = bytearray(FRAME_SIZE)
+    state.encode_command(buffer)
+    assert bytes(buffer) == DeviceState(frame).cmd
+    copy = state.copy()
+    copy.desiredTemperature = 30
+    assert state.desiredTemperature != 30
+
+
+def test_protocol_splits_stream():
+    """Test frames are cut out of chunks of any size, skipping garbage."""
+    frames = record_frames(20)
+    stream = b"\x00\x01\xaa" + b"".join(frames[:10]) + b"\x55" + b"".join(frames[10:])
+    received = []
+    protocol = FrameProtocol(Mock(), received.append, Mock())
+    for size in (1, 7, 21, 50, 64):
+        received.clear()
+        for start in range(0, len(stream), size):
+            protocol.data_received(stream[start : start + size])
+        assert [state.raw for state in received] == frames
+        assert not protocol._buffer
+
+
+async def test_protocol_reports_lost_link():
+    """Test the lost callback learns which protocol went down."""
+    lost = Mock()
+    protocol = FrameProtocol(asyncio.get_running_loop(), Mock(), lost)
+    protocol.connection_lost(None)
+    lost.assert_called_once_with(protocol)
+    assert protocol.closed.done()
@@ -1,20 +1,26 @@
-"""Test integration_blueprint config flow."""
+"""Test Home Easy HVAC Local config flow."""
+
 from unittest.mock import patch
 
 from homeassistant import config_entries, data_entry_flow
 import pytest
 from pytest_homeassistant_custom_component.common import MockConfigEntry
 
-from custom_components.integration_blueprint.const import (
-    BINARY_SENSOR,
+from custom_components.homeeasy_local.const import (
+    CLIMATE,
+    CONF_CAPTURE,
+    CONF_COALESCE_WINDOW,
+    CONF_COOLDOWN,
+    CONF_HEARTBEAT_MISSES,
+    CONF_RECONCILE,
+    CONF_SCAN_INTERVAL,
     DOMAIN,
-    PLATFORMS,
+    RECONCILE_ENFORCE,
+    SELECT,
     SENSOR,
     SWITCH,
 )
 
-from .const import MOCK_CONFIG
-
 
 # This fixture bypasses the actual setup of the integration
 # since we only want to test the config flow. We test the
@@ -23,88 +29,135 @@ from .const import MOCK_CONFIG
 def bypass_setup_fixture():
     """Prevent setup."""
     with patch(
-        "custom_components.integration_blueprint.async_setup",
+        "custom_components.homeeasy_local.async_setup",
         return_value=True,
     ), patch(
-        "custom_components.integration_blueprint.async_setup_entry",
+        "custom_components.homeeasy_local.async_setup_entry",
         return_value=True,
     ):
         yield
 
 
-# Here we simiulate a successful config flow from the backend.
-# Note that we use the `bypass_get_data` fixture here because
-# we want the config flow validation to succeed during the test.
-async def test_successful_config_flow(hass, bypass_get_data):
+# Here we simulate a successful config flow against a simulated unit.
+async def test_successful_config_flow(hass, unit, mock_config):
     """Test a successful config flow."""
     # Initialize a config flow
     result = await hass.config_entries.flow.async_init(
         DOMAIN, context={"source": config_entries.SOURCE_USER}
     )
 
-    # Check that the config flow shows the user form as the first step
-    assert result["type"] == data_entry_flow.RESULT_TYPE_FORM
+    # Check that the config flow shows the menu as the first step
+    assert result["type"] == data_entry_flow.RESULT_TYPE_MENU
     assert result["step_id"] == "user"
 
-    # If a user were to enter `test_username` for username and `test_password`
-    # for password, it would result in this function call
     result = await hass.config_entries.flow.async_configure(
-        result["flow_id"], user_input=MOCK_CONFIG
+        result["flow_id"], user_input={"next_step_id": "manual"}
+    )
+    assert result["type"] == data_entry_flow.RESULT_TYPE_FORM
+    assert result["step_id"] == "manual"
+
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], user_input=mock_config
     )
 
     # Check that the config flow is complete and a new entry is created with
     # the input data
     assert result["type"] == data_entry_flow.RESULT_TYPE_CREATE_ENTRY
-    assert result["title"] == "test_username"
-    assert result["data"] == MOCK_CONFIG
+    assert result["title"] == mock_config["ip"]
+    assert result["data"] == mock_config
     assert result["result"]
+    assert unit.status_requests == 1
 
 
 # In this case, we want to simulate a failure during the config flow.
-# We use the `error_on_get_data` mock instead of `bypass_get_data`
-# (note the function parameters) to raise an Exception during
+# We use the `error_on_get_data` mock to raise an Exception during
 # validation of the input config.
-async def test_failed_config_flow(hass, error_on_get_data):
-    """Test a failed config flow due to credential validation failure."""
+async def test_failed_config_flow(hass, mock_config, error_on_get_data):
+    """Test a failed config flow due to connection failure."""
     result = await hass.config_entries.flow.async_init(
         DOMAIN, context={"source": config_entries.SOURCE_USER}
     )
 
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], user_input={"next_step_id": "manual"}
+    )
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], user_input=mock_config
+    )
+
     assert result["type"] == data_entry_flow.RESULT_TYPE_FORM
-    assert result["step_id"] == "user"
+    assert result["errors"] == {"base": "auth"}
+
 
+async def test_scan_config_flow(hass, unit):
+    """Test units found by a scan are offered and added."""
+    result = await hass.config_entries.flow.async_init(
+        DOMAIN, context={"source": config_entries.SOURCE_USER}
+    )
     result = await hass.config_entries.flow.async_configure(
-        result["flow_id"], user_input=MOCK_CONFIG
+        result["flow_id"], user_input={"next_step_id": "scan"}
     )
+    assert result["type"] == data_entry_flow.RESULT_TYPE_FORM
+    assert result["step_id"] == "scan"
 
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], user_input={"subnets": "bogus", "port": unit.port}
+    )
+    assert result["errors"] == {"base": "invalid_subnet"}
+
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], user_input={"subnets": "10.0.0.0/8", "port": unit.port}
+    )
+    assert result["errors"] == {"base": "invalid_subnet"}
+
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], user_input={"subnets": "127.0.0.1/32", "port": unit.port}
+    )
     assert result["type"] == data_entry_flow.RESULT_TYPE_FORM
-    assert result["errors"] == {"base": "auth"}
+    assert result["step_id"] == "pick"
+
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], user_input={"units": ["127.0.0.1"]}
+    )
+    assert result["type"] == data_entry_flow.RESULT_TYPE_CREATE_ENTRY
+    assert result["data"] == {"ip": "127.0.0.1", "port": unit.port}
+
+    # The unit is configured now, a second scan must not offer it again
+    result = await hass.config_entries.flow.async_init(
+        DOMAIN, context={"source": config_entries.SOURCE_USER}
+    )
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], user_input={"next_step_id": "scan"}
+    )
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], user_input={"subnets": "127.0.0.1/32", "port": unit.port}
+    )
+    assert result["errors"] == {"base": "no_devices"}
 
 
-# Our config flow also has an options flow, so we must test it as well.
 async def test_options_flow(hass):
-    """Test an options flow."""
-    # Create a new MockConfigEntry and add to HASS (we're bypassing config
-    # flow entirely)
-    entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    """Test the options flow stores the tuning and platform toggles."""
+    entry = MockConfigEntry(domain=DOMAIN, data={"ip": "127.0.0.1"}, entry_id="test")
     entry.add_to_hass(hass)
 
-    # Initialize an options flow
     result = await hass.config_entries.options.async_init(entry.entry_id)
-
-    # Verify that the first options step is a user form
     assert result["type"] == data_entry_flow.RESULT_TYPE_FORM
-    assert result["step_id"] == "user"
-
-    # Enter some fake data into the form
+    assert result["step_id"] == "init"
+
+    options = {
+        CONF_SCAN_INTERVAL: 60,
+        CONF_COOLDOWN: 10.0,
+        CONF_COALESCE_WINDOW: 0.2,
+        CONF_RECONCILE: RECONCILE_ENFORCE,
+        CONF_HEARTBEAT_MISSES: 3,
+        CONF_CAPTURE: True,
+        CLIMATE: True,
+        SELECT: False,
+        SWITCH: True,
+        SENSOR: False,
+    }
     result = await hass.config_entries.options.async_configure(
-        result["flow_id"],
-        user_input={platform: platform != SENSOR for platform in PLATFORMS},
+        result["flow_id"], user_input=options
     )
-
-    # Verify that the flow finishes
     assert result["type"] == data_entry_flow.RESULT_TYPE_CREATE_ENTRY
-    assert result["title"] == "test_username"
-
-    # Verify that the options were updated
-    assert entry.options == {BINARY_SENSOR: True, SENSOR: False, SWITCH: True}
+    assert entry.options == options
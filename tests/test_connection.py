@@ -0,0 +1,257 @@
+"""Test Home Easy HVAC Local connection manager."""
+
+import asyncio
+from datetime import timedelta
+from unittest.mock import Mock, patch
+
+from homeassistant.const import STATE_UNAVAILABLE
+from homeassistant.helpers import entity_registry as er
+from homeassistant.util import dt as dt_util
+import pytest
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_fire_time_changed,
+)
+
+from custom_components.homeeasy_local.connection import (
+    BACKOFF_MAX,
+    BACKOFF_MIN,
+    PROBE_BEATS,
+    Connection,
+    ConnectionState,
+)
+from custom_components.homeeasy_local.const import CLIMATE, DOMAIN
+from custom_components.homeeasy_local.heartbeat import HEARTBEAT_SLOTS, Heartbeat
+
+from .conftest import wait_for
+
+
+async def _setup(hass, mock_config):
+    config_entry = MockConfigEntry(domain=DOMAIN, data=mock_config, entry_id="test")
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    return hass.data[DOMAIN][config_entry.entry_id]
+
+
+async def test_reconnect_after_drop(hass, unit, mock_config):
+    """Test the link comes back after the unit drops it."""
+    coordinator = await _setup(hass, mock_config)
+    connection = coordinator.connection
+    assert connection.connects == 1
+
+    unit.drop_connections()
+    await wait_for(lambda: connection.state == ConnectionState.BACKOFF)
+    assert connection.disconnects == 1
+    assert not coordinator.last_update_success
+
+    async_fire_time_changed(hass, dt_util.utcnow() + BACKOFF_MIN)
+    await wait_for(lambda: coordinator.last_update_success)
+    assert connection.connects == 2
+    assert unit.clients == 1
+
+    # Pushes are delivered again on the new link
+    unit.update(desiredTemperature=20)
+    await unit.push()
+    await wait_for(lambda: coordinator.state.desiredTemperature == 20)
+
+
+async def test_half_open_link(hass, unit, mock_config):
+    """Test a link that stops answering is torn down."""
+    coordinator = await _setup(hass, mock_config)
+    connection = coordinator.connection
+
+    unit.silent = True
+    # The first beat sees the frames of the setup, the next ones only count
+    # once a poll is waiting for an answer
+    connection.async_heartbeat()
+    connection.async_heartbeat()
+    assert connection.misses == 0
+    await connection.async_request_status()
+    with patch(
+        "custom_components.homeeasy_local.connection.STATUS_TIMEOUT",
+        timedelta(0),
+    ):
+        for _ in range(connection.miss_threshold):
+            connection.async_heartbeat()
+    await wait_for(lambda: connection.state == ConnectionState.BACKOFF)
+    assert connection.disconnects == 1
+    assert connection.metrics.timeouts == 1
+
+    unit.silent = False
+    async_fire_time_changed(hass, dt_util.utcnow() + BACKOFF_MIN * 2)
+    await wait_for(lambda: coordinator.last_update_success)
+
+
+async def test_backoff_grows(hass):
+    """Test retry delays grow exponentially up to the cap."""
+    connection = Connection(hass, "127.0.0.1", 1, None, lambda state: None)
+    with patch("random.uniform", side_effect=lambda low, high: high):
+        delays = []
+        for attempt in range(12):
+            connection._attempt = attempt
+            delays.append(connection._backoff_delay())
+    assert delays[:4] == [1, 2, 4, 8]
+    assert delays[-1] == BACKOFF_MAX.total_seconds()
+
+
+async def test_heartbeat_probes_silent_units(hass, unit, mock_config):
+    """Test beats only ask for a probe of a silent link and never write."""
+    coordinator = await _setup(hass, mock_config)
+    connection = coordinator.connection
+    requests = unit.status_requests
+
+    # The first beat sees the frames of the setup
+    probes = [connection.async_heartbeat() for _ in range(1 + 2 * PROBE_BEATS)]
+    assert probes == [False] + ([False] * (PROBE_BEATS - 1) + [True]) * 2
+    await asyncio.sleep(0.01)
+    assert unit.status_requests == requests
+    assert connection.misses == 0
+
+    # A pushed frame answers the beat, no probe is needed
+    last_frame = connection._last_frame
+    await unit.push()
+    await wait_for(lambda: connection._last_frame != last_frame)
+    probes = [connection.async_heartbeat() for _ in range(PROBE_BEATS)]
+    assert probes == [False] * PROBE_BEATS
+    assert connection.misses == 0
+    assert unit.status_requests == requests
+
+
+async def test_heartbeat_marks_unavailable(hass, unit, mock_config):
+    """Test entities become unavailable a few beats into a poll left unanswered."""
+    with patch(
+        "custom_components.homeeasy_local.heartbeat.HEARTBEAT_INTERVAL",
+        timedelta(seconds=0.4),
+    ), patch(
+        "custom_components.homeeasy_local.connection.STATUS_TIMEOUT",
+        timedelta(seconds=0.4),
+    ):
+        coordinator = await _setup(hass, mock_config)
+        entity_id = er.async_get(hass).async_get_entity_id(CLIMATE, DOMAIN, "test")
+        await wait_for(lambda: hass.states.get(entity_id).state != STATE_UNAVAILABLE)
+
+        unit.silent = True
+        poll = hass.async_create_task(coordinator.async_poll())
+        await wait_for(
+            lambda: hass.states.get(entity_id).state == STATE_UNAVAILABLE, timeout=2
+        )
+    assert coordinator.connection.state == ConnectionState.BACKOFF
+    await poll
+
+
+async def test_idle_unit_going_silent(hass, unit, mock_config):
+    """Test an idle unit that stops answering is unavailable within the bound."""
+    interval = 0.4
+    with patch(
+        "custom_components.homeeasy_local.heartbeat.HEARTBEAT_INTERVAL",
+        timedelta(seconds=interval),
+    ), patch(
+        "custom_components.homeeasy_local.connection.STATUS_TIMEOUT",
+        timedelta(seconds=interval),
+    ):
+        coordinator = await _setup(hass, mock_config)
+        connection = coordinator.connection
+        entity_id = er.async_get(hass).async_get_entity_id(CLIMATE, DOMAIN, "test")
+        await wait_for(lambda: hass.states.get(entity_id).state != STATE_UNAVAILABLE)
+
+        unit.silent = True
+        # One beat to notice the last frame, PROBE_BEATS to probe, then the
+        # misses or the status timeout, whichever is longer, and a beat of slack
+        bound = (
+            (PROBE_BEATS + 1) * interval
+            + max(connection.miss_threshold * interval, interval)
+            + interval
+        )
+        await wait_for(
+            lambda: hass.states.get(entity_id).state == STATE_UNAVAILABLE,
+            timeout=bound + 0.5,
+        )
+    assert connection.state == ConnectionState.BACKOFF
+    assert connection.metrics.timeouts >= 1
+
+
+async def test_heartbeat_wheel(hass):
+    """Test links are spread over the wheel and each beats once per turn."""
+    scheduler = Mock()
+    heartbeat = Heartbeat(hass, scheduler)
+    links = [Mock() for _ in range(2 * HEARTBEAT_SLOTS)]
+    for link in links:
+        link.async_heartbeat.return_value = link is links[0]
+        heartbeat.async_add(link)
+    for _ in range(HEARTBEAT_SLOTS):
+        heartbeat._tick(None)
+        assert sum(link.async_heartbeat.call_count for link in links) % 2 == 0
+    assert all(link.async_heartbeat.call_count == 1 for link in links)
+    scheduler.async_schedule.assert_called_once_with(links[0], 0, jitter=False)
+
+    for link in links:
+        heartbeat.async_remove(link)
+    assert heartbeat._unsub is None
+    assert scheduler.async_unschedule.call_count == len(links)
+
+
+async def test_command_overtakes_poll(hass, unit, mock_config):
+    """Test a command is answered while a slow status reply is in flight."""
+    coordinator = await _setup(hass, mock_config)
+    connection = coordinator.connection
+    unit.status_delay = 0.5
+
+    poll = hass.async_create_task(connection.async_fetch_state())
+    await wait_for(lambda: unit.status_requests == 2)
+    sent = unit.frames_sent
+    state = coordinator.state.copy()
+    state.desiredTemperature = 18
+    await connection.async_send(state)
+    assert connection.inflight == 2
+    await wait_for(lambda: unit.state.desiredTemperature == 18, timeout=0.3)
+    await wait_for(lambda: connection.inflight == 0, timeout=0.3)
+    assert connection.metrics.command_confirmation.max < 500
+    assert (await poll).desiredTemperature == 18
+    # The slow status reply still arrives afterwards
+    await wait_for(lambda: unit.frames_sent == sent + 2)
+
+
+async def test_fetches_share_status_request(hass, unit, mock_config):
+    """Test callers asking while a status request is in flight join it."""
+    coordinator = await _setup(hass, mock_config)
+    connection = coordinator.connection
+    requests = unit.status_requests
+    unit.status_delay = 0.1
+
+    states = await asyncio.gather(*(connection.async_fetch_state() for _ in range(3)))
+    assert unit.status_requests == requests + 1
+    assert all(state is states[0] for state in states)
+    await asyncio.sleep(0.15)
+
+
+async def test_requests_time_out_individually(hass, unit, mock_config):
+    """Test a request nothing answers fails on its own timeout."""
+    coordinator = await _setup(hass, mock_config)
+    connection = coordinator.connection
+    unit.silent = True
+
+    with pytest.raises(TimeoutError):
+        await connection.async_fetch_state(timedelta(seconds=0.1))
+    assert connection.inflight == 0
+    assert connection.metrics.timeouts == 1
+    assert connection.connected
+
+
+async def test_connect_times_out(hass):
+    """Test a unit that never answers the connect fails fast and backs off."""
+
+    async def _hang(*args, **kwargs):
+        await asyncio.Event().wait()
+
+    connection = Connection(hass, "192.0.2.1", 1, None, lambda state: None)
+    with patch(
+        "custom_components.homeeasy_local.connection.CONNECT_TIMEOUT",
+        timedelta(seconds=0.1),
+    ), patch.object(hass.loop, "create_connection", _hang):
+        async with asyncio.timeout(1):
+            with pytest.raises(ConnectionError):
+                await connection.async_fetch_state()
+    assert connection.failures == 1
+    assert connection.state == ConnectionState.BACKOFF
+    await connection.async_disconnect()
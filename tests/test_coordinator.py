@@ -0,0 +1,470 @@
+"""Test Home Easy HVAC Local update coordinator."""
+
+import asyncio
+from datetime import timedelta
+from unittest.mock import patch
+
+from homeassistant.components.climate import (
+    ATTR_FAN_MODE,
+    ATTR_HVAC_MODE,
+    ATTR_SWING_MODE,
+    ATTR_TEMPERATURE,
+    SERVICE_SET_FAN_MODE,
+    SERVICE_SET_HVAC_MODE,
+    SERVICE_SET_SWING_MODE,
+    SERVICE_SET_TEMPERATURE,
+    HVACMode,
+)
+from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.entity import Entity
+from homeassistant.util import dt as dt_util
+from homeeasy.DeviceState import FanMode, HorizontalFlowMode, Mode, VerticalFlowMode
+import pytest
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_fire_time_changed,
+)
+
+from custom_components.homeeasy_local.const import (
+    CLIMATE,
+    DOMAIN,
+    RECONCILE_ENFORCE,
+    RECONCILE_OFF,
+    SWITCH,
+)
+from custom_components.homeeasy_local.coordinator import (
+    COMMAND_SCAN_INTERVAL,
+    OFF_SCAN_INTERVAL,
+    RECONCILE_RETRIES,
+    SCAN_INTERVAL,
+)
+
+from custom_components.homeeasy_local.scheduler import (
+    MAX_INFLIGHT_POLLS,
+    POLL_JITTER,
+    PollScheduler,
+)
+from custom_components.homeeasy_local.throttle import TokenBucket
+
+from .conftest import wait_for
+
+
+async def _setup(hass, mock_config):
+    config_entry = MockConfigEntry(domain=DOMAIN, data=mock_config, entry_id="test")
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    entity_id = er.async_get(hass).async_get_entity_id(
+        CLIMATE, DOMAIN, config_entry.entry_id
+    )
+    return hass.data[DOMAIN][config_entry.entry_id], entity_id
+
+
+async def test_send_coalesces_commands(hass, unit, mock_config):
+    """Test changes made within the coalescing window go out as one frame."""
+    coordinator, entity_id = await _setup(hass, mock_config)
+
+    await asyncio.gather(
+        *(
+            hass.services.async_call(
+                CLIMATE, service, {ATTR_ENTITY_ID: entity_id, **data}, blocking=True
+            )
+            for service, data in (
+                (SERVICE_SET_HVAC_MODE, {ATTR_HVAC_MODE: HVACMode.HEAT}),
+                (SERVICE_SET_TEMPERATURE, {ATTR_TEMPERATURE: 27}),
+                (SERVICE_SET_FAN_MODE, {ATTR_FAN_MODE: "High"}),
+                (SERVICE_SET_SWING_MODE, {ATTR_SWING_MODE: "Both"}),
+            )
+        )
+    )
+
+    await wait_for(lambda: coordinator.state.desiredTemperature == 27)
+    assert unit.commands == 1
+    state = unit.state
+    assert state.mode == Mode.Heat
+    assert state.desiredTemperature == 27
+    assert state.fanMode == FanMode.l5
+    assert state.flowHorizontalMode == HorizontalFlowMode.Swing
+    assert state.flowVerticalMode == VerticalFlowMode.Swing
+
+
+async def test_send_outside_window(hass, unit, mock_config):
+    """Test changes further apart than the window are sent separately."""
+    coordinator, entity_id = await _setup(hass, mock_config)
+    coordinator.coalesce_window = 0
+
+    for temperature in (20, 21):
+        await hass.services.async_call(
+            CLIMATE,
+            SERVICE_SET_TEMPERATURE,
+            {ATTR_ENTITY_ID: entity_id, ATTR_TEMPERATURE: temperature},
+            blocking=True,
+        )
+
+    await wait_for(lambda: unit.commands == 2)
+
+
+async def test_send_keeps_pushed_changes(hass, unit, mock_config):
+    """Test a push landing before the frame goes out is not reverted."""
+    coordinator, entity_id = await _setup(hass, mock_config)
+    coordinator.coalesce_window = 0.2
+    live = coordinator.state
+
+    command = hass.async_create_task(
+        hass.services.async_call(
+            CLIMATE,
+            SERVICE_SET_TEMPERATURE,
+            {ATTR_ENTITY_ID: entity_id, ATTR_TEMPERATURE: 27},
+            blocking=True,
+        )
+    )
+    unit.update(display=False)
+    await unit.push()
+    await wait_for(lambda: not coordinator.state.display)
+    await command
+
+    await wait_for(lambda: unit.commands == 1)
+    assert unit.state.desiredTemperature == 27
+    assert not unit.state.display
+    assert live.desiredTemperature != 27
+
+
+async def test_send_refuses_invalid_values(hass, unit, mock_config):
+    """Test a value the unit cannot take is refused without being queued."""
+    coordinator, _ = await _setup(hass, mock_config)
+    unit.update(temperatureScale=True)
+    await unit.push()
+    await wait_for(lambda: coordinator.state.temperatureScale)
+
+    # Fahrenheit units take 61 to 88 degrees
+    with pytest.raises(HomeAssistantError):
+        await coordinator.send(desiredTemperature=24)
+    assert not coordinator._queued
+    assert not coordinator._pending_changes
+
+    await coordinator.send(display=False)
+    await wait_for(lambda: not unit.state.display)
+
+
+async def test_send_carries_unconfirmed_changes(hass, unit, mock_config):
+    """Test a command sent before the previous one is confirmed keeps it."""
+    coordinator, entity_id = await _setup(hass, mock_config)
+    coordinator.coalesce_window = 0
+    unit.response_delay = 0.1
+
+    for service, data in (
+        (SERVICE_SET_TEMPERATURE, {ATTR_TEMPERATURE: 27}),
+        (SERVICE_SET_FAN_MODE, {ATTR_FAN_MODE: "High"}),
+    ):
+        await hass.services.async_call(
+            CLIMATE, service, {ATTR_ENTITY_ID: entity_id, **data}, blocking=True
+        )
+
+    await wait_for(lambda: unit.commands == 2)
+    assert unit.state.desiredTemperature == 27
+    assert unit.state.fanMode == FanMode.l5
+    await wait_for(lambda: not coordinator.desired)
+
+
+async def test_optimistic_state(hass, unit, mock_config):
+    """Test the requested value is shown before the unit confirms it."""
+    coordinator, entity_id = await _setup(hass, mock_config)
+    unit.response_delay = 0.3
+
+    command = hass.async_create_task(
+        hass.services.async_call(
+            CLIMATE,
+            SERVICE_SET_HVAC_MODE,
+            {ATTR_ENTITY_ID: entity_id, ATTR_HVAC_MODE: HVACMode.OFF},
+            blocking=True,
+        )
+    )
+    await wait_for(lambda: hass.states.get(entity_id).state == HVACMode.OFF)
+    assert coordinator.state.power
+    assert unit.commands == 0
+
+    await command
+    assert not coordinator.state.power
+    assert coordinator.shown_state is coordinator.state
+
+
+async def test_optimistic_state_rollback(hass, unit, mock_config):
+    """Test a change the unit never confirms is rolled back."""
+    coordinator, entity_id = await _setup(hass, mock_config)
+    previous = hass.states.get(entity_id).state
+    coordinator.reconcile = RECONCILE_OFF
+    unit.silent = True
+
+    with patch(
+        "custom_components.homeeasy_local.coordinator.CONFIRM_TIMEOUT",
+        timedelta(seconds=0.2),
+    ), pytest.raises(HomeAssistantError):
+        await hass.services.async_call(
+            CLIMATE,
+            SERVICE_SET_HVAC_MODE,
+            {ATTR_ENTITY_ID: entity_id, ATTR_HVAC_MODE: HVACMode.OFF},
+            blocking=True,
+        )
+
+    await hass.async_block_till_done()
+    assert hass.states.get(entity_id).state == previous
+    assert coordinator.shown_state is coordinator.state
+
+
+@pytest.fixture(name="reconcile_now")
+def reconcile_now_fixture():
+    """Send differing fields again as soon as the unit reports them."""
+    with patch(
+        "custom_components.homeeasy_local.coordinator.RECONCILE_DELAY", timedelta()
+    ):
+        yield
+
+
+async def test_reconcile_retries(hass, unit, mock_config, reconcile_now):
+    """Test a change the unit did not apply is sent again."""
+    coordinator, entity_id = await _setup(hass, mock_config)
+    unit.ignore_commands = 1
+
+    await hass.services.async_call(
+        CLIMATE,
+        SERVICE_SET_TEMPERATURE,
+        {ATTR_ENTITY_ID: entity_id, ATTR_TEMPERATURE: 27},
+        blocking=True,
+    )
+
+    assert unit.commands == 2
+    assert unit.state.desiredTemperature == 27
+    assert not coordinator.desired
+
+
+async def test_reconcile_gives_up(hass, unit, mock_config, reconcile_now):
+    """Test a change is rolled back once its retries run out."""
+    coordinator, entity_id = await _setup(hass, mock_config)
+    previous = hass.states.get(entity_id).attributes[ATTR_TEMPERATURE]
+    unit.ignore_commands = 100
+
+    with pytest.raises(HomeAssistantError):
+        await hass.services.async_call(
+            CLIMATE,
+            SERVICE_SET_TEMPERATURE,
+            {ATTR_ENTITY_ID: entity_id, ATTR_TEMPERATURE: 27},
+            blocking=True,
+        )
+
+    assert unit.commands == 1 + RECONCILE_RETRIES
+    assert not coordinator.desired
+    assert hass.states.get(entity_id).attributes[ATTR_TEMPERATURE] == previous
+
+
+async def test_reconcile_after_outage(hass, unit, mock_config):
+    """Test a change made while the link is down is sent once it is back."""
+    coordinator, _ = await _setup(hass, mock_config)
+    unit.drop_connections()
+    await wait_for(lambda: not coordinator.connection.connected)
+
+    await coordinator.send(desiredTemperature=27)
+
+    assert unit.state.desiredTemperature == 27
+    assert unit.commands == 1
+
+
+async def test_reconcile_enforce(hass, unit, mock_config, reconcile_now):
+    """Test enforced fields are restored after a remote control change."""
+    coordinator, _ = await _setup(hass, mock_config)
+    coordinator.reconcile = RECONCILE_ENFORCE
+    await coordinator.send(desiredTemperature=27)
+
+    unit.update(desiredTemperature=20)
+    await unit.push()
+
+    await wait_for(lambda: unit.commands == 2)
+    await wait_for(lambda: unit.state.desiredTemperature == 27)
+    assert coordinator.desired == {"desiredTemperature": 27}
+
+
+async def test_rate_limit_merges_commands(hass, unit, mock_config):
+    """Test commands made while rate limited go out as one frame."""
+    coordinator, _ = await _setup(hass, mock_config)
+    coordinator.coalesce_window = 0
+    coordinator._bucket = TokenBucket(5, 1, hass.loop.time())
+
+    await coordinator.send(desiredTemperature=20)
+    await asyncio.gather(
+        coordinator.send(desiredTemperature=21),
+        coordinator.send(desiredTemperature=22),
+    )
+
+    assert unit.commands == 2
+    assert unit.state.desiredTemperature == 22
+    metrics = coordinator.connection.metrics
+    assert metrics.throttled >= 1
+    assert metrics.dropped == 1
+    assert metrics.queue_depth == 0
+
+
+async def test_power_off_preempts(hass, unit, mock_config):
+    """Test a power off skips the rate limiter and drops pending fan changes."""
+    coordinator, _ = await _setup(hass, mock_config)
+    coordinator.coalesce_window = 0
+    coordinator._bucket = TokenBucket(0.01, 1, hass.loop.time())
+    fan_mode = coordinator.state.fanMode
+
+    await coordinator.send(desiredTemperature=20)
+    fan = hass.async_create_task(coordinator.send(fanMode=FanMode.Turbo))
+    await asyncio.sleep(0.05)
+    async with asyncio.timeout(1):
+        await coordinator.send(power=False)
+        await fan
+
+    assert unit.commands == 2
+    assert not unit.state.power
+    assert unit.state.fanMode == fan_mode
+    assert coordinator.connection.metrics.dropped == 1
+
+
+async def test_push_updates_entities(hass, unit, mock_config):
+    """Test unsolicited pushes reach Home Assistant without polling."""
+    coordinator, entity_id = await _setup(hass, mock_config)
+    requests = unit.status_requests
+
+    unit.update(desiredTemperature=19)
+    await unit.push()
+
+    await wait_for(
+        lambda: hass.states.get(entity_id).attributes[ATTR_TEMPERATURE] == 19,
+        timeout=1,
+    )
+    assert unit.status_requests == requests
+
+
+async def test_push_writes_changed_entities_only(hass, unit, mock_config, monkeypatch):
+    """Test a push only writes the entities showing the fields that changed."""
+    coordinator, entity_id = await _setup(hass, mock_config)
+    display_id = er.async_get(hass).async_get_entity_id(SWITCH, DOMAIN, "test")
+    frames = []
+    remove = coordinator.async_add_listener(lambda: frames.append(None))
+    writes = []
+    write = Entity.async_write_ha_state
+
+    def _write(self):
+        writes.append(self.entity_id)
+        write(self)
+
+    monkeypatch.setattr(Entity, "async_write_ha_state", _write)
+
+    unit.set_indoor_temperature(24.5)
+    await unit.push()
+    await wait_for(lambda: coordinator.state.indoorTemperature == 24.5)
+    assert writes == [entity_id]
+
+    writes.clear()
+    frames.clear()
+    await unit.push()
+    await wait_for(lambda: frames)
+    assert writes == []
+
+    unit.update(display=not coordinator.state.display)
+    await unit.push()
+    await wait_for(lambda: coordinator.state.display == unit.state.display)
+    assert writes == [display_id]
+    remove()
+
+
+async def test_adaptive_poll_interval(hass, unit, mock_config):
+    """Test the polling fallback follows what the unit is doing."""
+    coordinator, entity_id = await _setup(hass, mock_config)
+    assert coordinator.update_interval == SCAN_INTERVAL
+
+    await hass.services.async_call(
+        CLIMATE,
+        SERVICE_SET_HVAC_MODE,
+        {ATTR_ENTITY_ID: entity_id, ATTR_HVAC_MODE: HVACMode.OFF},
+        blocking=True,
+    )
+    assert coordinator.update_interval == COMMAND_SCAN_INTERVAL
+
+    coordinator._command_until = 0
+    await unit.push()
+    await wait_for(lambda: coordinator.update_interval == OFF_SCAN_INTERVAL)
+
+
+async def test_poll_when_stale(hass, unit, mock_config):
+    """Test the unit is polled once no push arrived within the interval."""
+    coordinator, entity_id = await _setup(hass, mock_config)
+    requests = unit.status_requests
+
+    async_fire_time_changed(hass, dt_util.utcnow() + SCAN_INTERVAL / 2)
+    await hass.async_block_till_done()
+    assert unit.status_requests == requests
+
+    async_fire_time_changed(
+        hass, dt_util.utcnow() + SCAN_INTERVAL + timedelta(seconds=1)
+    )
+    await hass.async_block_till_done()
+    await wait_for(lambda: unit.status_requests == requests + 1)
+
+
+class _Polled:
+    """Stand-in coordinator whose polls last until released."""
+
+    def __init__(self, commanding=False):
+        self.commanding = commanding
+        self.polls = 0
+        self.release = asyncio.Event()
+
+    async def async_poll(self):
+        self.polls += 1
+        await self.release.wait()
+
+
+async def test_scheduler_spreads_polls(hass):
+    """Test polls are jittered within their interval instead of in lockstep."""
+    scheduler = PollScheduler(hass)
+    units = [_Polled() for _ in range(50)]
+    start = hass.loop.time()
+    for unit in units:
+        scheduler.async_schedule(unit, SCAN_INTERVAL.total_seconds())
+    offsets = [scheduler._due[unit] - start for unit in units]
+    low = SCAN_INTERVAL.total_seconds() * (1 - POLL_JITTER)
+    assert all(low <= offset <= SCAN_INTERVAL.total_seconds() + 1 for offset in offsets)
+    assert len({round(offset, 3) for offset in offsets}) > 1
+
+    async_fire_time_changed(hass, dt_util.utcnow() + SCAN_INTERVAL / 2)
+    await hass.async_block_till_done()
+    assert not any(unit.polls for unit in units)
+    scheduler.async_stop()
+
+
+async def test_scheduler_caps_inflight_polls(hass):
+    """Test due polls queue behind the cap, units with commands first."""
+    scheduler = PollScheduler(hass)
+    units = [_Polled() for _ in range(MAX_INFLIGHT_POLLS * 2)]
+    commanding = _Polled(commanding=True)
+    for unit in [*units, commanding]:
+        scheduler.async_schedule(unit, 1, jitter=False)
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=2))
+    await asyncio.sleep(0)
+    assert scheduler.inflight == MAX_INFLIGHT_POLLS
+    assert commanding.polls == 1
+    assert sum(unit.polls for unit in units) == MAX_INFLIGHT_POLLS - 1
+
+    for unit in [*units, commanding]:
+        unit.release.set()
+    await hass.async_block_till_done()
+    assert all(unit.polls == 1 for unit in units)
+    assert scheduler.inflight == 0
+
+
+async def test_scheduler_drops_stale_entries(hass):
+    """Test rescheduling on every push does not pile up stale heap entries."""
+    scheduler = PollScheduler(hass)
+    units = [_Polled() for _ in range(10)]
+    for _ in range(1000):
+        for unit in units:
+            scheduler.async_schedule(unit, SCAN_INTERVAL.total_seconds())
+    assert len(scheduler._heap) <= 2 * len(units) + 64
+    assert set(scheduler._due.values()) <= {due for due, _, _ in scheduler._heap}
+    scheduler.async_stop()
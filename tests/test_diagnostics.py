@@ -0,0 +1,89 @@
+"""Test Home Easy HVAC Local diagnostics and link health sensors."""
+
+from homeassistant.components.climate import (
+    ATTR_TEMPERATURE,
+    SERVICE_SET_TEMPERATURE,
+)
+from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.helpers import entity_registry as er
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.homeeasy_local.const import CLIMATE, DOMAIN, SENSOR
+from custom_components.homeeasy_local.diagnostics import (
+    async_get_config_entry_diagnostics,
+)
+from custom_components.homeeasy_local.metrics import Histogram
+
+from .conftest import wait_for
+
+
+def test_histogram():
+    """Test percentiles are bucket bounds capped at the largest value."""
+    histogram = Histogram()
+    assert histogram.percentile(95) is None
+    for value in (0.5, 3, 3, 3, 3, 3, 3, 3, 3, 700):
+        histogram.add(value)
+    assert histogram.count == 10
+    assert histogram.percentile(50) == 4
+    assert histogram.percentile(95) == 700
+    assert histogram.as_dict()["buckets"] == {"<=1ms": 1, "<=4ms": 8, "<=1024ms": 1}
+
+
+async def test_diagnostics(hass, unit, mock_config):
+    """Test the dump carries the latencies of the unit."""
+    config_entry = MockConfigEntry(domain=DOMAIN, data=mock_config, entry_id="test")
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    await wait_for(lambda: coordinator.state is not None)
+
+    entity_id = er.async_get(hass).async_get_entity_id(
+        CLIMATE, DOMAIN, config_entry.entry_id
+    )
+    await hass.services.async_call(
+        CLIMATE,
+        SERVICE_SET_TEMPERATURE,
+        {ATTR_ENTITY_ID: entity_id, ATTR_TEMPERATURE: 26},
+        blocking=True,
+    )
+    metrics = coordinator.connection.metrics
+    await wait_for(lambda: metrics.command_confirmation.count == 1)
+
+    diagnostics = await async_get_config_entry_diagnostics(hass, config_entry)
+    assert diagnostics["connection"]["connects"] == 1
+    assert diagnostics["state"]["desiredTemperature"] == 26
+    metrics = diagnostics["metrics"]
+    assert metrics["command_confirmation"]["max"] > 0
+    assert metrics["status_round_trip"]["count"] >= 1
+    assert metrics["command_confirmation"]["count"] == 1
+    assert metrics["push_interval"]["count"] >= 1
+    assert metrics["timeouts"] == 0
+
+
+async def test_sensors_disabled_by_default(hass, unit, mock_config):
+    """Test the link health sensors are diagnostic and opt-in."""
+    config_entry = MockConfigEntry(domain=DOMAIN, data=mock_config, entry_id="test")
+    config_entry.add_to_hass(hass)
+    registry = er.async_get(hass)
+    registry.async_get_or_create(
+        SENSOR,
+        DOMAIN,
+        "test_status_round_trip",
+        config_entry=config_entry,
+        suggested_object_id="status_round_trip",
+    )
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+
+    entry = registry.async_get(
+        registry.async_get_entity_id(SENSOR, DOMAIN, "test_reconnects")
+    )
+    assert entry.disabled_by is er.RegistryEntryDisabler.INTEGRATION
+    assert entry.entity_category is er.EntityCategory.DIAGNOSTIC
+
+    await coordinator.connection.async_fetch_state()
+    await wait_for(
+        lambda: hass.states.get("sensor.status_round_trip").state != "unknown"
+    )
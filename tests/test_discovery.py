@@ -0,0 +1,78 @@
+"""Test Home Easy HVAC Local discovery."""
+
+import asyncio
+from unittest.mock import patch
+
+from homeassistant.setup import async_setup_component
+import pytest
+import voluptuous as vol
+
+from custom_components.homeeasy_local.const import DOMAIN, SERVICE_SCAN
+from custom_components.homeeasy_local.discovery import async_probe, async_scan
+
+
+async def test_probe(hass, unit):
+    """Test a unit is recognised and a closed port is not."""
+    assert await async_probe(unit.host, unit.port)
+    port = unit.port
+    await unit.stop()
+    assert not await async_probe(unit.host, port, timeout=0.2)
+
+
+async def test_scan(hass, unit):
+    """Test the scan finds the unit and skips excluded hosts."""
+    assert await async_scan(["127.0.0.1/32"] * 2, unit.port) == ["127.0.0.1"]
+    assert await async_scan(["127.0.0.1/32"], unit.port, exclude=["127.0.0.1"]) == []
+
+
+async def test_scan_rejects_large_subnets(hass):
+    """Test a subnet too large to sweep is refused before probing anything."""
+    with patch(
+        "custom_components.homeeasy_local.discovery.async_probe"
+    ) as probe, pytest.raises(ValueError):
+        await async_scan(["10.0.0.0/24", "10.0.0.0/8"])
+    probe.assert_not_called()
+
+    assert await async_setup_component(hass, DOMAIN, {})
+    with pytest.raises(vol.Invalid):
+        await hass.services.async_call(
+            DOMAIN, SERVICE_SCAN, {"subnets": "10.0.0.0/19"}, blocking=True
+        )
+
+
+async def test_scan_is_concurrent(hass):
+    """Test slow hosts are probed in parallel with bounded concurrency."""
+    in_flight = 0
+    peak = 0
+
+    async def _probe(host, port, timeout):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.1)
+        in_flight -= 1
+        return host.endswith(".7")
+
+    with patch("custom_components.homeeasy_local.discovery.async_probe", _probe):
+        found = await async_scan(["10.0.0.0/22"], concurrency=256)
+    assert found == ["10.0.0.7", "10.0.1.7", "10.0.2.7", "10.0.3.7"]
+    assert peak == 256
+
+
+async def test_scan_service(hass, unit):
+    """Test the scan service offers new units for setup."""
+    assert await async_setup_component(hass, DOMAIN, {})
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_SCAN,
+        {"subnets": "127.0.0.1/32", "port": unit.port},
+        blocking=True,
+        return_response=True,
+    )
+    await hass.async_block_till_done()
+
+    assert response == {"found": ["127.0.0.1"]}
+    flows = hass.config_entries.flow.async_progress_by_handler(DOMAIN)
+    assert len(flows) == 1
+    assert flows[0]["step_id"] == "discovery_confirm"
@@ -0,0 +1,109 @@
+"""Test Home Easy HVAC Local shared link hub."""
+
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.setup import async_setup_component
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.homeeasy_local.const import CONF_HEARTBEAT_MISSES, DOMAIN
+from custom_components.homeeasy_local.hub import async_get_hub
+
+from .conftest import wait_for
+from .simulator import SimulatedFleet
+
+
+async def test_entries_share_one_link(hass, unit, mock_config):
+    """Test entries pointing at the same unit share its connection."""
+    entries = [
+        MockConfigEntry(domain=DOMAIN, data=mock_config, entry_id=f"test{index}")
+        for index in range(2)
+    ]
+    for entry in entries:
+        entry.add_to_hass(hass)
+    # Setting up the first entry sets up the integration and every entry
+    assert await hass.config_entries.async_setup(entries[0].entry_id)
+    await hass.async_block_till_done()
+
+    first, second = (hass.data[DOMAIN][entry.entry_id] for entry in entries)
+    assert first.connection is second.connection
+    assert unit.clients == 1
+
+    unit.update(desiredTemperature=30)
+    await unit.push()
+    await wait_for(
+        lambda: first.state.desiredTemperature == second.state.desiredTemperature == 30
+    )
+
+    hub = async_get_hub(hass)
+    await first.async_close()
+    assert hub.connections
+    assert first.connection.connected
+
+    await second.async_close()
+    assert not hub.connections
+    await wait_for(lambda: unit.clients == 0)
+
+
+async def test_frames_routed_by_address(hass, socket_enabled):
+    """Test frames only reach the coordinator of the unit they came from."""
+    async with SimulatedFleet(3) as fleet:
+        entries = []
+        for unit in fleet:
+            entry = MockConfigEntry(
+                domain=DOMAIN, data={"ip": unit.host, "port": unit.port}
+            )
+            entry.add_to_hass(hass)
+            entries.append(entry)
+        assert await async_setup_component(hass, DOMAIN, {})
+        await hass.async_block_till_done()
+        coordinators = [hass.data[DOMAIN][entry.entry_id] for entry in entries]
+
+        target = fleet.units[1]
+        target.update(desiredTemperature=17)
+        await target.push()
+        await wait_for(lambda: coordinators[1].state.desiredTemperature == 17)
+        assert coordinators[0].state.desiredTemperature == 24
+        assert coordinators[2].state.desiredTemperature == 24
+        assert len(async_get_hub(hass).connections) == 3
+
+        for coordinator in coordinators:
+            await coordinator.async_close()
+
+
+async def test_shared_link_heartbeat_misses(hass, unit, mock_config):
+    """Test a shared link tolerates the fewest misses any of its entries set."""
+    entries = [
+        MockConfigEntry(
+            domain=DOMAIN,
+            data=mock_config,
+            options={CONF_HEARTBEAT_MISSES: misses},
+            entry_id=f"test{misses}",
+        )
+        for misses in (5, 3)
+    ]
+    for entry in entries:
+        entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entries[0].entry_id)
+    await hass.async_block_till_done()
+    patient, impatient = (hass.data[DOMAIN][entry.entry_id] for entry in entries)
+    connection = patient.connection
+    assert connection.miss_threshold == 3
+
+    await impatient.async_close()
+    assert connection.miss_threshold == 5
+    await patient.async_close()
+
+
+async def test_links_closed_on_stop(hass, unit, mock_config):
+    """Test every link is closed when Home Assistant stops."""
+    entry = MockConfigEntry(domain=DOMAIN, data=mock_config, entry_id="test")
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    connection = hass.data[DOMAIN][entry.entry_id].connection
+    assert connection.connected
+
+    hass.bus.async_fire(EVENT_HOMEASSISTANT_STOP)
+    await hass.async_block_till_done()
+    assert not async_get_hub(hass).connections
+    assert not connection.connected
+    await wait_for(lambda: unit.clients == 0)
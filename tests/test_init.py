@@ -1,56 +1,286 @@
-"""Test integration_blueprint setup process."""
-from homeassistant.exceptions import ConfigEntryNotReady
-import pytest
-from pytest_homeassistant_custom_component.common import MockConfigEntry
-
-from custom_components.integration_blueprint import (
-    BlueprintDataUpdateCoordinator,
-    async_reload_entry,
-    async_setup_entry,
-    async_unload_entry,
+"""Test Home Easy HVAC Local setup process."""
+
+import asyncio
+from datetime import timedelta
+from unittest.mock import patch
+
+from homeassistant import config_entries, data_entry_flow
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.const import ATTR_ASSUMED_STATE, ATTR_TEMPERATURE, STATE_UNAVAILABLE
+from homeassistant.helpers import entity_registry as er
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_fire_time_changed,
+)
+
+from custom_components.homeeasy_local import UpdateCoordinator
+from custom_components.homeeasy_local.connection import BACKOFF_MAX, ConnectionState
+from custom_components.homeeasy_local.const import (
+    CLIMATE,
+    CONF_COOLDOWN,
+    CONF_SCAN_INTERVAL,
+    DOMAIN,
+    SELECT,
+    SWITCH,
+    STORAGE_KEY,
+    STORAGE_VERSION,
 )
-from custom_components.integration_blueprint.const import DOMAIN
+from custom_components.homeeasy_local.coordinator import STARTUP_SPREAD
+from custom_components.homeeasy_local.hub import async_get_hub
 
-from .const import MOCK_CONFIG
+from .conftest import wait_for
 
 
-# We can pass fixtures as defined in conftest.py to tell pytest to use the fixture
-# for a given test. We can also leverage fixtures and mocks that are available in
-# Home Assistant using the pytest_homeassistant_custom_component plugin.
-# Assertions allow you to verify that the return value of whatever is on the left
-# side of the assertion matches with the right side.
-async def test_setup_unload_and_reload_entry(hass, bypass_get_data):
+async def test_setup_unload_and_reload_entry(hass, unit, mock_config):
     """Test entry setup and unload."""
-    # Create a mock entry so we don't have to go through config flow
-    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    config_entry = MockConfigEntry(domain=DOMAIN, data=mock_config, entry_id="test")
+    config_entry.add_to_hass(hass)
 
-    # Set up the entry and assert that the values set during setup are where we expect
-    # them to be. Because we have patched the BlueprintDataUpdateCoordinator.async_get_data
-    # call, no code from custom_components/integration_blueprint/api.py actually runs.
-    assert await async_setup_entry(hass, config_entry)
+    # Set up the entry against the simulated unit and assert that the values set
+    # during setup are where we expect them to be.
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
     assert DOMAIN in hass.data and config_entry.entry_id in hass.data[DOMAIN]
-    assert (
-        type(hass.data[DOMAIN][config_entry.entry_id]) == BlueprintDataUpdateCoordinator
-    )
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    assert type(coordinator) == UpdateCoordinator
+    assert unit.status_requests >= 1
+    assert coordinator.state.desiredTemperature == 24
 
     # Reload the entry and assert that the data from above is still there
-    assert await async_reload_entry(hass, config_entry) is None
+    connection = coordinator.connection
+    assert await hass.config_entries.async_reload(config_entry.entry_id)
+    await hass.async_block_till_done()
     assert DOMAIN in hass.data and config_entry.entry_id in hass.data[DOMAIN]
-    assert (
-        type(hass.data[DOMAIN][config_entry.entry_id]) == BlueprintDataUpdateCoordinator
-    )
+    assert type(hass.data[DOMAIN][config_entry.entry_id]) == UpdateCoordinator
+    # The old link was closed by the unload
+    assert connection.state == ConnectionState.DISCONNECTED
+    assert not connection._client.connected
 
     # Unload the entry and verify that the data has been removed
-    assert await async_unload_entry(hass, config_entry)
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+    assert config_entry.state is ConfigEntryState.NOT_LOADED
     assert config_entry.entry_id not in hass.data[DOMAIN]
+    assert coordinator.connection.state == ConnectionState.DISCONNECTED
+    assert not async_get_hub(hass).connections
+    assert not config_entry.update_listeners
+
+
+async def test_setup_unreachable_unit(hass, unit, mock_config, error_on_get_data):
+    """Test setup does not wait for a unit that cannot be reached."""
+    config_entry = MockConfigEntry(domain=DOMAIN, data=mock_config, entry_id="test")
+    config_entry.add_to_hass(hass)
+
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    assert config_entry.state is ConfigEntryState.LOADED
+
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    assert coordinator.connection.state == ConnectionState.BACKOFF
+    entity_id = er.async_get(hass).async_get_entity_id(
+        CLIMATE, DOMAIN, config_entry.entry_id
+    )
+    assert hass.states.get(entity_id).state == STATE_UNAVAILABLE
+
+
+async def test_setup_restores_last_state(hass, hass_storage, unit, mock_config):
+    """Test entities show the stored state until the unit answers."""
+    stored = unit.state
+    stored.desiredTemperature = 18
+    hass_storage[STORAGE_KEY] = {
+        "version": STORAGE_VERSION,
+        "key": STORAGE_KEY,
+        "data": {"test": stored.raw.hex()},
+    }
+    config_entry = MockConfigEntry(domain=DOMAIN, data=mock_config, entry_id="test")
+    config_entry.add_to_hass(hass)
+    unit.response_delay = 0.5
+
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    entity_id = er.async_get(hass).async_get_entity_id(
+        CLIMATE, DOMAIN, config_entry.entry_id
+    )
+    state = hass.states.get(entity_id)
+    assert state.attributes[ATTR_TEMPERATURE] == 18
+    assert state.attributes[ATTR_ASSUMED_STATE]
+
+    # The live state replaces the stored one once the unit answers, the poll
+    # confirming it is spread over the startup window
+    async_fire_time_changed(hass, dt_util.utcnow() + STARTUP_SPREAD)
+    await wait_for(
+        lambda: hass.states.get(entity_id).attributes[ATTR_TEMPERATURE] == 24
+    )
+    assert ATTR_ASSUMED_STATE not in hass.states.get(entity_id).attributes
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    assert not coordinator.stale
+
+
+async def test_state_saved_while_pushing(hass, hass_storage, unit, mock_config):
+    """Test the state is written while the unit keeps pushing."""
+    config_entry = MockConfigEntry(domain=DOMAIN, data=mock_config, entry_id="test")
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+
+    # The loop clock moves on by a push interval at every step, so timers
+    # restarted on each push would never come due.
+    loop_time = hass.loop.time
+    skew = 0.0
+    with patch.object(hass.loop, "time", lambda: loop_time() + skew):
+        for step in range(1, 31):
+            unit.update(desiredTemperature=16 + step % 10)
+            await unit.push()
+            await wait_for(lambda: coordinator.state.raw == unit.state.raw)
+            skew += 20
+            async_fire_time_changed(hass)
+            await hass.async_block_till_done()
+            if STORAGE_KEY in hass_storage:
+                break
+    assert step == 2
+    stored = bytes.fromhex(hass_storage[STORAGE_KEY]["data"]["test"])
+    assert stored == unit.state.raw
+
+
+async def test_setup_ignores_truncated_state(hass, hass_storage, unit, mock_config):
+    """Test a stored state of the wrong length is ignored."""
+    hass_storage[STORAGE_KEY] = {
+        "version": STORAGE_VERSION,
+        "key": STORAGE_KEY,
+        "data": {"test": unit.state.raw.hex()[:20]},
+    }
+    config_entry = MockConfigEntry(domain=DOMAIN, data=mock_config, entry_id="test")
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    await wait_for(lambda: coordinator.state is not None)
+    assert not coordinator.stale
+
+
+async def test_setup_adopts_config_flow_link(hass, unit, mock_config):
+    """Test setup reuses the connection and state verified by the config flow."""
+    result = await hass.config_entries.flow.async_init(
+        DOMAIN, context={"source": config_entries.SOURCE_USER}
+    )
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], user_input={"next_step_id": "manual"}
+    )
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], user_input=mock_config
+    )
+    assert result["type"] == data_entry_flow.RESULT_TYPE_CREATE_ENTRY
+    await hass.async_block_till_done()
+
+    entry = result["result"]
+    assert entry.state is ConfigEntryState.LOADED
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    assert coordinator.state.desiredTemperature == 24
+    assert unit.connections == 1
+    assert unit.status_requests == 1
+
+
+async def test_options_apply_in_place(hass, unit, mock_config):
+    """Test changed options reach the running coordinator without a reconnect."""
+    config_entry = MockConfigEntry(domain=DOMAIN, data=mock_config, entry_id="test")
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    connection = coordinator.connection
+    registry = er.async_get(hass)
+    climate_id = registry.async_get_entity_id(CLIMATE, DOMAIN, config_entry.entry_id)
+    switch_id = registry.async_get_entity_id(SWITCH, DOMAIN, config_entry.entry_id)
+    select_ids = [
+        entity.entity_id
+        for entity in er.async_entries_for_config_entry(registry, "test")
+        if entity.domain == SELECT
+    ]
+
+    hass.config_entries.async_update_entry(
+        config_entry,
+        options={CONF_SCAN_INTERVAL: 120, CONF_COOLDOWN: 5, SWITCH: False},
+    )
+    await hass.async_block_till_done()
+    assert hass.data[DOMAIN][config_entry.entry_id] is coordinator
+    assert coordinator.connection is connection and connection.connects == 1
+    assert coordinator.update_interval.total_seconds() == 120
+    assert coordinator._debounced_refresh.cooldown == 5
+    # The registry keeps the entity, it is shown as no longer provided
+    assert hass.states.get(switch_id).attributes.get("restored")
+    assert SWITCH not in coordinator.platforms
+    # Entities of the untouched platforms are kept, not set up again
+    assert hass.states.get(climate_id) is not None
+    assert all(hass.states.get(entity_id) is not None for entity_id in select_ids)
+
+    hass.config_entries.async_update_entry(config_entry, options={})
+    await hass.async_block_till_done()
+    assert not hass.states.get(switch_id).attributes.get("restored")
+    assert connection.connects == 1
+
+
+async def test_platform_toggled_off_keeps_polling(hass, unit, mock_config):
+    """Test unloading a single platform leaves the coordinator running."""
+    config_entry = MockConfigEntry(domain=DOMAIN, data=mock_config, entry_id="test")
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    climate_id = er.async_get(hass).async_get_entity_id(
+        CLIMATE, DOMAIN, config_entry.entry_id
+    )
+
+    hass.config_entries.async_update_entry(config_entry, options={SWITCH: False})
+    await hass.async_block_till_done()
+    assert not coordinator._shutdown_requested
+
+    requests = unit.status_requests
+    unit.update(desiredTemperature=20)
+    async_fire_time_changed(hass, dt_util.utcnow() + coordinator.update_interval * 1.5)
+    await wait_for(lambda: unit.status_requests > requests)
+    await wait_for(
+        lambda: hass.states.get(climate_id).attributes[ATTR_TEMPERATURE] == 20
+    )
+
+    requests = unit.status_requests
+    await coordinator.async_request_refresh()
+    async_fire_time_changed(
+        hass,
+        dt_util.utcnow()
+        + timedelta(seconds=coordinator._debounced_refresh.cooldown + 1),
+    )
+    await wait_for(lambda: unit.status_requests > requests)
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+    assert coordinator._shutdown_requested
+
+
+async def test_unload_while_reconnecting(hass, unit, mock_config):
+    """Test unloading while the link is being reopened leaves nothing open."""
+    config_entry = MockConfigEntry(domain=DOMAIN, data=mock_config, entry_id="test")
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    connection = hass.data[DOMAIN][config_entry.entry_id].connection
+
+    unit.drop_connections()
+    await wait_for(lambda: connection.state == ConnectionState.BACKOFF)
+    gate = asyncio.Event()
+    create_connection = hass.loop.create_connection
 
+    async def _slow_connection(*args, **kwargs):
+        await gate.wait()
+        return await create_connection(*args, **kwargs)
 
-async def test_setup_entry_exception(hass, error_on_get_data):
-    """Test ConfigEntryNotReady when API raises an exception during entry setup."""
-    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    with patch.object(hass.loop, "create_connection", _slow_connection):
+        async_fire_time_changed(hass, dt_util.utcnow() + BACKOFF_MAX)
+        await wait_for(lambda: connection.state == ConnectionState.CONNECTING)
+        assert await hass.config_entries.async_unload(config_entry.entry_id)
+        gate.set()
+        await hass.async_block_till_done()
 
-    # In this case we are testing the condition where async_setup_entry raises
-    # ConfigEntryNotReady using the `error_on_get_data` fixture which simulates
-    # an error.
-    with pytest.raises(ConfigEntryNotReady):
-        assert await async_setup_entry(hass, config_entry)
+    assert not async_get_hub(hass).connections
+    assert connection.state == ConnectionState.DISCONNECTED
+    assert not connection._client.connected
+    await wait_for(lambda: unit.clients == 0)
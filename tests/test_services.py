@@ -0,0 +1,134 @@
+"""Test Home Easy HVAC Local fleet services."""
+
+from homeassistant.components.climate import ATTR_HVAC_MODE, HVACMode
+from homeassistant.const import ATTR_ENTITY_ID, ATTR_TEMPERATURE, ENTITY_MATCH_ALL
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import entity_registry as er
+from homeassistant.setup import async_setup_component
+from homeeasy.DeviceState import Mode
+import pytest
+import voluptuous as vol
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.homeeasy_local.const import (
+    CLIMATE,
+    CONF_IP,
+    CONF_PORT,
+    DOMAIN,
+    SERVICE_BULK_SET,
+)
+
+from .conftest import disconnect_coordinators, wait_for
+from .simulator import SimulatedFleet
+
+
+@pytest.fixture(name="fleet")
+async def fleet_fixture(hass, socket_enabled):
+    """Start a few simulated units, each set up as an entry."""
+    fleet = SimulatedFleet(3)
+    await fleet.start()
+    entries = []
+    for unit in fleet:
+        entry = MockConfigEntry(
+            domain=DOMAIN,
+            title=f"{unit.host}:{unit.port}",
+            data={CONF_IP: unit.host, CONF_PORT: unit.port},
+        )
+        entry.add_to_hass(hass)
+        entries.append(entry)
+    assert await async_setup_component(hass, DOMAIN, {})
+    await hass.async_block_till_done()
+    await wait_for(
+        lambda: all(hass.data[DOMAIN][entry.entry_id].state for entry in entries)
+    )
+    yield list(zip(fleet, entries))
+    await disconnect_coordinators(hass)
+    await fleet.stop()
+
+
+async def test_bulk_set(hass, fleet):
+    """Test every unit gets the change and the result is reported per unit."""
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_BULK_SET,
+        {
+            ATTR_ENTITY_ID: ENTITY_MATCH_ALL,
+            ATTR_HVAC_MODE: HVACMode.COOL,
+            ATTR_TEMPERATURE: 24,
+        },
+        blocking=True,
+        return_response=True,
+    )
+
+    assert response["failed"] == 0
+    assert response["units"] == {
+        entry.entry_id: {CONF_IP: unit.host, "success": True} for unit, entry in fleet
+    }
+    for unit, _ in fleet:
+        assert unit.commands == 1
+        assert unit.state.mode == Mode.Cool
+        assert unit.state.desiredTemperature == 24
+
+
+async def test_bulk_set_target(hass, fleet):
+    """Test only the targeted units are changed."""
+    (unit, entry), *others = fleet
+    entity_id = er.async_get(hass).async_get_entity_id(CLIMATE, DOMAIN, entry.entry_id)
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_BULK_SET,
+        {ATTR_ENTITY_ID: entity_id, ATTR_TEMPERATURE: 30},
+        blocking=True,
+        return_response=True,
+    )
+
+    assert list(response["units"]) == [entry.entry_id]
+    assert unit.state.desiredTemperature == 30
+    assert all(other.commands == 0 for other, _ in others)
+
+
+async def test_bulk_set_validation(hass, fleet):
+    """Test calls without a target or with a temperature out of range fail."""
+    (_, entry), *_ = fleet
+    entity_id = er.async_get(hass).async_get_entity_id(CLIMATE, DOMAIN, entry.entry_id)
+    for data in (
+        {ATTR_TEMPERATURE: 24},
+        {ATTR_ENTITY_ID: entity_id, ATTR_TEMPERATURE: 10},
+        {ATTR_ENTITY_ID: entity_id, ATTR_TEMPERATURE: 32},
+    ):
+        with pytest.raises(vol.Invalid):
+            await hass.services.async_call(
+                DOMAIN, SERVICE_BULK_SET, data, blocking=True
+            )
+    assert all(unit.commands == 0 for unit, _ in fleet)
+
+
+async def test_bulk_set_timeout(hass, fleet):
+    """Test a unit not confirming in time is reported without holding the rest."""
+    (silent, entry), *others = fleet
+    silent.silent = True
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_BULK_SET,
+        {ATTR_ENTITY_ID: ENTITY_MATCH_ALL, ATTR_TEMPERATURE: 20, "timeout": 0.5},
+        blocking=True,
+        return_response=True,
+    )
+
+    assert response["failed"] == 1
+    assert response["units"][entry.entry_id] == {
+        CONF_IP: silent.host,
+        "success": False,
+        "error": "timeout",
+    }
+    assert all(unit.state.desiredTemperature == 20 for unit, _ in others)
+
+    with pytest.raises(HomeAssistantError):
+        await hass.services.async_call(
+            DOMAIN,
+            SERVICE_BULK_SET,
+            {ATTR_ENTITY_ID: ENTITY_MATCH_ALL, ATTR_TEMPERATURE: 21, "timeout": 0.5},
+            blocking=True,
+        )
@@ -0,0 +1,232 @@
+"""Soak tests of the integration's resource accounting.
+
+They take minutes, so they only run with HOMEEASY_SOAK set. The number of
+cycles can be raised through environment variables, for example:
+
+    HOMEEASY_SOAK=1 HOMEEASY_SOAK_RELOADS=20000 pytest tests/test_soak.py
+    HOMEEASY_SOAK=1 HOMEEASY_SOAK_UNITS=300 HOMEEASY_SOAK_HOURS=24 pytest tests/test_soak.py
+"""
+
+import asyncio
+from datetime import timedelta
+import gc
+import logging
+import os
+import random
+import tracemalloc
+from unittest.mock import patch
+
+from homeassistant.components.climate import (
+    ATTR_TEMPERATURE,
+    SERVICE_SET_TEMPERATURE,
+)
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.helpers import entity_registry as er
+from homeassistant.setup import async_setup_component
+from homeassistant.util import dt as dt_util
+import pytest
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_fire_time_changed,
+)
+
+from custom_components.homeeasy_local.const import CLIMATE, CONF_IP, CONF_PORT, DOMAIN
+
+from .benchmark import REPORT
+from .conftest import disconnect_coordinators, wait_for
+from .simulator import SimulatedFleet
+
+# Soak tests are opt-in, they would not fit the per test timeout of CI.
+soak = pytest.mark.skipif(
+    not os.environ.get("HOMEEASY_SOAK"), reason="set HOMEEASY_SOAK to run"
+)
+RELOADS = int(os.environ.get("HOMEEASY_SOAK_RELOADS", "2000"))
+# Memory the reloads after the warm up may add, the test harness included.
+RELOAD_MEMORY_BUDGET = int(os.environ.get("HOMEEASY_SOAK_MEMORY_BYTES", "131072"))
+UNITS = int(os.environ.get("HOMEEASY_SOAK_UNITS", "100"))
+HOURS = float(os.environ.get("HOMEEASY_SOAK_HOURS", "1"))
+# Simulated time between two rounds of pushes, polls, commands and reloads.
+STEP = timedelta(minutes=1)
+# Rounds between two resource samples, the first sample follows a warm up.
+SAMPLE_EVERY = 6
+# Memory a fleet may add per simulated hour once warmed up, the test harness
+# included.
+FLEET_MEMORY_BUDGET = int(
+    os.environ.get("HOMEEASY_SOAK_FLEET_MEMORY_BYTES", str(1024 * 1024))
+)
+
+
+def _open_fds() -> int:
+    return len(os.listdir("/proc/self/fd"))
+
+
+async def _settle(hass, unit):
+    """Wait until the entry is back up and the old link is gone."""
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN]["test"]
+    await wait_for(
+        lambda: coordinator.connection.connected
+        and coordinator.last_update_success
+        and unit.clients == 1
+    )
+
+
+async def _resources():
+    """Return the open file descriptors, tasks and traced memory."""
+    # Give closed sockets and finished tasks a turn to be released.
+    await asyncio.sleep(0)
+    gc.collect()
+    return _open_fds(), len(asyncio.all_tasks()), tracemalloc.get_traced_memory()[0]
+
+
+@soak
+async def test_reload_soak(hass, unit, mock_config):
+    """Test reloading an entry over and over leaks no socket, task or memory."""
+    entry = MockConfigEntry(domain=DOMAIN, data=mock_config, entry_id="test")
+    entry.add_to_hass(hass)
+    warmup = max(RELOADS // 10, 1)
+
+    with patch(
+        "custom_components.homeeasy_local.coordinator.STARTUP_SPREAD",
+        timedelta(0),
+    ):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await _settle(hass, unit)
+        # Captured log records and the tracebacks debug mode keeps for every
+        # handle would pile up and drown what is measured.
+        logging.disable(logging.CRITICAL)
+        hass.loop.set_debug(False)
+        tracemalloc.start()
+        try:
+            for _ in range(warmup):
+                assert await hass.config_entries.async_reload(entry.entry_id)
+                await _settle(hass, unit)
+            fds, tasks, memory = await _resources()
+            for _ in range(RELOADS - warmup):
+                assert await hass.config_entries.async_reload(entry.entry_id)
+                await _settle(hass, unit)
+            after = await _resources()
+        finally:
+            tracemalloc.stop()
+            hass.loop.set_debug(True)
+            logging.disable(logging.NOTSET)
+
+    assert entry.state is ConfigEntryState.LOADED
+    assert unit.connections == RELOADS + 1
+    REPORT.metric("memory growth per reload", "B").add(
+        (after[2] - memory) / (RELOADS - warmup)
+    )
+    assert after[0] == fds
+    assert after[1] == tasks
+    assert after[2] - memory < RELOAD_MEMORY_BUDGET
+
+
+def _growing(samples) -> bool:
+    """Return True if every sample is above the one before."""
+    return all(later > earlier for earlier, later in zip(samples, samples[1:]))
+
+
+def _listeners(hass) -> int:
+    """Return the event and coordinator listeners registered."""
+    coordinators = hass.data.get(DOMAIN, {}).values()
+    return sum(hass.bus.async_listeners().values()) + sum(
+        len(coordinator._listeners) for coordinator in coordinators
+    )
+
+
+async def _quiesce(hass, fleet):
+    """Wait until every unit is linked, answered and fully published."""
+    await hass.async_block_till_done()
+    await wait_for(
+        lambda: all(
+            coordinator.connection.connected
+            and coordinator.last_update_success
+            and coordinator.connection.inflight == 0
+            for coordinator in hass.data[DOMAIN].values()
+        )
+        and all(unit.clients == 1 for unit in fleet),
+        timeout=30,
+    )
+    await hass.async_block_till_done()
+
+
+@soak
+async def test_fleet_soak(hass, socket_enabled):
+    """Test hours of pushes, polls, commands and reloads on a fleet leak nothing.
+
+    Resources are sampled while simulated time moves on, the test fails if the
+    tasks, listeners, sockets or memory grow at every sample.
+    """
+    rng = random.Random(0)
+    # Traced from the start, objects replaced by a reload would count as new
+    # otherwise.
+    tracemalloc.start()
+    fleet = SimulatedFleet(UNITS)
+    await fleet.start()
+    entries = []
+    for unit in fleet:
+        entry = MockConfigEntry(
+            domain=DOMAIN,
+            title=f"{unit.host}:{unit.port}",
+            data={CONF_IP: unit.host, CONF_PORT: unit.port},
+        )
+        entry.add_to_hass(hass)
+        entries.append(entry)
+    assert await async_setup_component(hass, DOMAIN, {})
+    registry = er.async_get(hass)
+    climates = [
+        registry.async_get_entity_id(CLIMATE, DOMAIN, entry.entry_id)
+        for entry in entries
+    ]
+    now = dt_util.utcnow()
+    rounds = int(HOURS * timedelta(hours=1) / STEP)
+    samples = []
+
+    logging.disable(logging.CRITICAL)
+    hass.loop.set_debug(False)
+    try:
+        for step in range(rounds + SAMPLE_EVERY):
+            for unit in rng.sample(fleet.units, max(len(fleet) // 10, 1)):
+                unit.set_indoor_temperature(round(rng.uniform(18, 28), 1))
+                await unit.push()
+            for entity_id in rng.sample(climates, max(len(fleet) // 50, 1)):
+                await hass.services.async_call(
+                    CLIMATE,
+                    SERVICE_SET_TEMPERATURE,
+                    {ATTR_ENTITY_ID: entity_id, ATTR_TEMPERATURE: rng.randint(17, 29)},
+                    blocking=True,
+                )
+            if step % 10 == 0:
+                for entry in rng.sample(entries, max(len(fleet) // 20, 1)):
+                    assert await hass.config_entries.async_reload(entry.entry_id)
+            # Polls, heartbeats and saves come due as time moves on
+            now += STEP
+            async_fire_time_changed(hass, now)
+            await _quiesce(hass, fleet)
+            if step >= SAMPLE_EVERY and step % SAMPLE_EVERY == 0:
+                samples.append(await _fleet_resources(hass))
+    finally:
+        tracemalloc.stop()
+        hass.loop.set_debug(True)
+        logging.disable(logging.NOTSET)
+        await disconnect_coordinators(hass)
+        await fleet.stop()
+
+    assert all(entry.state is ConfigEntryState.LOADED for entry in entries)
+    fds, tasks, listeners, memory = zip(*samples)
+    REPORT.metric(f"memory growth per hour ({len(fleet)} units)", "B").add(
+        (memory[-1] - memory[0]) / HOURS
+    )
+    assert not _growing(fds), fds
+    assert not _growing(tasks), tasks
+    assert not _growing(listeners), listeners
+    assert not (
+        _growing(memory) and memory[-1] - memory[0] > FLEET_MEMORY_BUDGET * HOURS
+    ), memory
+
+
+async def _fleet_resources(hass):
+    """Return the open file descriptors, tasks, listeners and traced memory."""
+    fds, tasks, memory = await _resources()
+    return fds, tasks, _listeners(hass), memory